@@ -1,12 +1,49 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import concurrent.futures
 from dataclasses import dataclass
 from datetime import datetime, timezone
+import hashlib
+import hmac
 import os
+import random
+import threading
 import time
 from urllib.parse import urlparse
 
 import httpx
+import orjson
+
+# Sentinel returned by _fetch_latest_workflow_run when the API answered
+# 304 Not Modified, i.e. nothing changed since the last poll.
+_UNCHANGED = object()
+
+_UTC = timezone.utc
+
+_BACKOFF_CAP_SECONDS = 60.0
+_BACKOFF_JITTER_SECONDS = 1.0
+
+_GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Fetch only the fields the poll loop looks at (~200 bytes) instead of
+# the full REST workflow-runs envelope (~10KB per poll).
+_CHECK_SUITE_QUERY = """
+query($owner: String!, $name: String!, $ref: String!) {
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $ref) {
+      target {
+        ... on Commit {
+          checkSuites(last: 1) {
+            nodes { status conclusion }
+          }
+        }
+      }
+    }
+  }
+}
+"""
 
 
 @dataclass
@@ -16,13 +53,105 @@ class CIStatus:
     details: str = ""
 
 
+def build_github_client(github_token: str) -> httpx.AsyncClient:
+    """Pooled HTTP/2 client with the standard GitHub API headers.
+
+    One instance can serve every poll of every run on an event loop;
+    HTTP/2 multiplexes concurrent polls over a single warm connection.
+    """
+    return httpx.AsyncClient(
+        timeout=20.0,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=10,
+            max_keepalive_connections=10,
+            keepalive_expiry=30.0,
+        ),
+        headers={
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "Authorization": f"Bearer {github_token}",
+        },
+    )
+
+
 class CIAgent:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        min_interval: float | None = None,
+        max_interval: float = _BACKOFF_CAP_SECONDS,
+        backoff_factor: float = 2.0,
+        http: httpx.AsyncClient | None = None,
+    ) -> None:
         self.github_token = os.getenv("GITHUB_TOKEN", "")
-        self.poll_interval = int(os.getenv("CI_POLL_INTERVAL_SECONDS", "5"))
+        self.poll_interval = (
+            min_interval if min_interval is not None else int(os.getenv("CI_POLL_INTERVAL_SECONDS", "5"))
+        )
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
         self.poll_timeout = int(os.getenv("CI_POLL_TIMEOUT_SECONDS", "180"))
+        # GraphQL trades the ETag/304 path for a far smaller payload per
+        # poll; opt-in because conditional requests only work over REST.
+        self.use_graphql = os.getenv("CI_USE_GRAPHQL", "false").lower() == "true"
+        # Injected shared client (owned and closed by the caller); the
+        # internal per-loop client is only the fallback.
+        self._external_client = http
+        self._external_loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+        # One CIAgent serves every concurrent run, so conditional-request
+        # ETags and rate-limit hints are keyed per (owner, repo, branch);
+        # a single shared slot would be clobbered across runs and the
+        # If-None-Match 304 saving would almost never hit.
+        self._etags: dict[tuple[str, str, str], str] = {}
+        self._retry_after: dict[tuple[str, str, str], float] = {}
+        # When a webhook secret is configured GitHub pushes workflow_run
+        # completion events to us and the poll loop is skipped entirely.
+        self.webhook_secret = os.getenv("GITHUB_WEBHOOK_SECRET", "")
+        self._waiters: dict[tuple[str, str, str], concurrent.futures.Future] = {}
+        self._waiters_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled async client for the running event loop.
+
+        The client is created lazily and rebuilt if the loop changes (the
+        sync poll_workflow_status wrapper runs each call in its own loop),
+        so pooled connections are never reused across loops. Within one
+        loop every poll after the first reuses the TCP+TLS session.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Prefer an injected shared client, but only on the loop where it
+        # first ran - its pooled connections must not cross loops.
+        if self._external_client is not None and not self._external_client.is_closed:
+            if self._external_loop is None:
+                self._external_loop = loop
+            if self._external_loop is loop:
+                return self._external_client
+
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = build_github_client(self.github_token)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    def close(self) -> None:
+        client = self._client
+        if client is not None and not client.is_closed:
+            try:
+                asyncio.run(client.aclose())
+            except RuntimeError:
+                pass
 
     def poll_workflow_status(self, repo_url: str, branch_name: str) -> CIStatus:
+        """Synchronous entry point kept for back-compat; delegates to the async poll."""
+        return asyncio.run(self.poll_workflow_status_async(repo_url, branch_name))
+
+    async def poll_workflow_status_async(self, repo_url: str, branch_name: str) -> CIStatus:
         owner_repo = self._extract_owner_repo(repo_url)
         if owner_repo is None:
             return CIStatus(status="FAILED", timestamp=self._utc_now(), details="Invalid GitHub repository URL")
@@ -31,49 +160,112 @@ class CIAgent:
             return CIStatus(status="FAILED", timestamp=self._utc_now(), details="Missing GITHUB_TOKEN")
 
         owner, repo = owner_repo
+        if self.webhook_secret:
+            return await self._await_webhook(owner, repo, branch_name)
+
         deadline = time.monotonic() + self.poll_timeout
+        key = (owner, repo, branch_name)
 
-        with httpx.Client(timeout=20.0) as client:
-            while time.monotonic() < deadline:
-                run_status = self._fetch_latest_workflow_run(client, owner, repo, branch_name)
-                if run_status is None:
-                    time.sleep(self.poll_interval)
-                    continue
+        idle_polls = 0
+        while time.monotonic() < deadline:
+            run_status = await self._fetch_latest_workflow_run(owner, repo, branch_name)
+            if run_status is _UNCHANGED or run_status is None:
+                # Nothing new (304 or transient error) - back off so idle
+                # workflows stop burning rate-limit quota.
+                idle_polls += 1
+                await asyncio.sleep(self._next_delay(idle_polls, deadline, key=key))
+                continue
 
-                status, conclusion = run_status
-                if status in {"queued", "in_progress", "waiting", "requested", "pending"}:
-                    time.sleep(self.poll_interval)
-                    continue
+            status, conclusion = run_status
+            if status in {"queued", "in_progress", "waiting", "requested", "pending"}:
+                idle_polls = 0
+                # A queued run won't finish soon, so poll it at a gentler
+                # base cadence than one that is actively executing.
+                await asyncio.sleep(self._next_delay(idle_polls, deadline, queued=status != "in_progress", key=key))
+                continue
 
-                if status == "completed" and conclusion == "success":
-                    return CIStatus(status="PASSED", timestamp=self._utc_now(), details="GitHub Actions workflow completed successfully")
+            if status == "completed" and conclusion == "success":
+                return CIStatus(status="PASSED", timestamp=self._utc_now(), details="GitHub Actions workflow completed successfully")
 
-                return CIStatus(
-                    status="FAILED",
-                    timestamp=self._utc_now(),
-                    details=f"GitHub Actions workflow completed with conclusion={conclusion or 'unknown'}",
-                )
+            return CIStatus(
+                status="FAILED",
+                timestamp=self._utc_now(),
+                details=f"GitHub Actions workflow completed with conclusion={conclusion or 'unknown'}",
+            )
 
         return CIStatus(status="FAILED", timestamp=self._utc_now(), details="CI polling timeout")
 
-    def _fetch_latest_workflow_run(
+    async def _await_webhook(self, owner: str, repo: str, branch_name: str) -> CIStatus:
+        """Wait for GitHub to push the workflow_run completion event.
+
+        O(1) push notification instead of O(timeout/interval) HTTP polls;
+        the future is thread-safe so the webhook endpoint can resolve it
+        from a different event loop/thread.
+        """
+        key = (owner.lower(), repo.lower(), branch_name)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._waiters_lock:
+            self._waiters[key] = future
+
+        try:
+            conclusion = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.poll_timeout)
+        except asyncio.TimeoutError:
+            return CIStatus(status="FAILED", timestamp=self._utc_now(), details="CI webhook wait timeout")
+        finally:
+            with self._waiters_lock:
+                self._waiters.pop(key, None)
+
+        if conclusion == "success":
+            return CIStatus(status="PASSED", timestamp=self._utc_now(), details="GitHub Actions workflow completed successfully")
+        return CIStatus(
+            status="FAILED",
+            timestamp=self._utc_now(),
+            details=f"GitHub Actions workflow completed with conclusion={conclusion or 'unknown'}",
+        )
+
+    def notify_workflow_completed(self, owner: str, repo: str, branch_name: str, conclusion: str | None) -> bool:
+        """Resolve the waiter for (owner, repo, branch); called by the webhook route."""
+        with self._waiters_lock:
+            future = self._waiters.pop((owner.lower(), repo.lower(), branch_name), None)
+        if future is not None and not future.done():
+            future.set_result(conclusion or "unknown")
+            return True
+        return False
+
+    def verify_webhook_signature(self, body: bytes, signature_header: str | None) -> bool:
+        if not self.webhook_secret or not signature_header:
+            return False
+        expected = "sha256=" + hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature_header)
+
+    async def _fetch_latest_workflow_run(
         self,
-        client: httpx.Client,
         owner: str,
         repo: str,
         branch_name: str,
-    ) -> tuple[str, str | None] | None:
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.github_token}",
-            "X-GitHub-Api-Version": "2022-11-28",
-        }
+    ) -> tuple[str, str | None] | None | object:
+        if self.use_graphql:
+            return await self._fetch_latest_via_graphql(owner, repo, branch_name)
+
+        key = (owner, repo, branch_name)
         url = f"https://api.github.com/repos/{owner}/{repo}/actions/runs"
-        response = client.get(url, headers=headers, params={"branch": branch_name, "per_page": 1})
+        etag = self._etags.get(key)
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self._get_client().get(url, headers=headers, params={"branch": branch_name, "per_page": 1})
+
+        if response.status_code == 304:
+            # Conditional hit: no body and no rate-limit unit consumed.
+            return _UNCHANGED
+
+        self._update_rate_limit_hint(response, key)
         if response.status_code >= 400:
             return None
 
-        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etags[key] = etag
+
+        data = orjson.loads(response.content)
         runs = data.get("workflow_runs", [])
         if not runs:
             return None
@@ -81,6 +273,64 @@ class CIAgent:
         latest = runs[0]
         return latest.get("status", ""), latest.get("conclusion")
 
+    async def _fetch_latest_via_graphql(
+        self,
+        owner: str,
+        repo: str,
+        branch_name: str,
+    ) -> tuple[str, str | None] | None:
+        payload = {
+            "query": _CHECK_SUITE_QUERY,
+            "variables": {"owner": owner, "name": repo, "ref": f"refs/heads/{branch_name}"},
+        }
+        response = await self._get_client().post(_GRAPHQL_URL, json=payload)
+
+        self._update_rate_limit_hint(response, (owner, repo, branch_name))
+        if response.status_code >= 400:
+            return None
+
+        data = orjson.loads(response.content)
+        ref = ((data.get("data") or {}).get("repository") or {}).get("ref")
+        if not ref:
+            return None
+        nodes = (((ref.get("target") or {}).get("checkSuites") or {}).get("nodes")) or []
+        if not nodes:
+            return None
+
+        latest = nodes[0]
+        # GraphQL enums are upper-case; map onto the REST vocabulary the
+        # poll loop expects (queued/in_progress/completed, success/...).
+        status = (latest.get("status") or "").lower()
+        conclusion = latest.get("conclusion")
+        return status, conclusion.lower() if conclusion else None
+
+    def _update_rate_limit_hint(self, response: httpx.Response, key: tuple[str, str, str]) -> None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            self._retry_after[key] = float(retry_after)
+            return
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = response.headers.get("X-RateLimit-Reset", "")
+            if reset.isdigit():
+                self._retry_after[key] = max(0.0, float(reset) - time.time())
+
+    def _next_delay(
+        self,
+        idle_polls: int,
+        deadline: float,
+        queued: bool = False,
+        key: tuple[str, str, str] | None = None,
+    ) -> float:
+        base = self.poll_interval * (2.0 if queued else 1.0)
+        delay = min(self.max_interval, base * (self.backoff_factor ** idle_polls))
+        delay += random.uniform(0, _BACKOFF_JITTER_SECONDS)
+        if key is not None:
+            retry_after = self._retry_after.pop(key, 0.0)
+            if retry_after:
+                delay = max(delay, retry_after)
+        remaining = deadline - time.monotonic()
+        return min(delay, max(remaining, 0.0))
+
     def _extract_owner_repo(self, repo_url: str) -> tuple[str, str] | None:
         parsed = urlparse(repo_url)
         if parsed.netloc.lower() not in {"github.com", "www.github.com"}:
@@ -97,4 +347,6 @@ class CIAgent:
         return owner, repo
 
     def _utc_now(self) -> str:
-        return datetime.now(timezone.utc).isoformat()
+        # Second precision is plenty for CI status stamps and keeps the
+        # serialized payload shorter.
+        return datetime.now(_UTC).isoformat(timespec="seconds")
@@ -1,12 +1,73 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import functools
 import logging
+import re
 
 from models import BugType
 
 logger = logging.getLogger(__name__)
 
+# Error-type keywords folded into one alternation so classification is a
+# single scan instead of ~8 sequential `in` checks. Group names mirror
+# BugType member names.
+_ERRTYPE_RE = re.compile(
+    r"(?P<IMPORT>importerror|modulenotfounderror)"
+    r"|(?P<SYNTAX>syntaxerror|invalidsyntax)"
+    r"|(?P<INDENTATION>indentationerror|taberror)"
+    r"|(?P<TYPE_ERROR>typeerror|attributeerror)"
+)
+# Exact exception-class names resolve in one dict lookup before any
+# lowering or scanning - the common case for pytest-reported failures.
+_ERROR_TYPE_MAP = {
+    "ImportError": BugType.IMPORT,
+    "ModuleNotFoundError": BugType.IMPORT,
+    "SyntaxError": BugType.SYNTAX,
+    "IndentationError": BugType.INDENTATION,
+    "TabError": BugType.INDENTATION,
+    "TypeError": BugType.TYPE_ERROR,
+    "AttributeError": BugType.TYPE_ERROR,
+}
+# All message keywords in one alternation: a single finditer pass
+# collects every hit instead of walking the (potentially long) message
+# once per keyword. The priority rules are then evaluated on the hit set.
+_MSG_KEYWORDS_RE = re.compile(
+    r"(?P<not_defined>is not defined)"
+    r"|(?P<no_module>no module)"
+    r"|(?P<cannot>cannot)"
+    r"|(?P<import_kw>import)"
+    r"|(?P<syntax>syntax)"
+    r"|(?P<indent>indent)"
+    r"|(?P<expected>expected)"
+    r"|(?P<type_kw>type)"
+    r"|(?P<got>got)"
+    r"|(?P<lint>lint|flake8|pylint)"
+)
+
+# Volatile tokens that vary between otherwise-identical failures (paths,
+# line references, memory addresses). They carry no classification signal
+# and are stripped before caching so the same NameError recurring from a
+# different line or clone path hits the same cache entry.
+_VOLATILE_TOKENS_RE = re.compile(
+    r"0x[0-9a-f]+"          # memory addresses
+    r"|(?:/[\w.\-]+){2,}"   # absolute file paths
+    r"|\bline \d+"          # line references
+)
+
+# Message heuristics as data, walked once in priority order: (primary
+# keyword group, any-of secondary groups, required error_lower needle).
+_MESSAGE_RULES: tuple[tuple[str, frozenset[str] | None, str | None, BugType], ...] = (
+    ("import_kw", frozenset({"cannot", "no_module"}), None, BugType.IMPORT),
+    # NameError for undefined names - often missing imports
+    ("not_defined", None, "nameerror", BugType.IMPORT),
+    ("syntax", None, None, BugType.SYNTAX),
+    ("indent", None, None, BugType.INDENTATION),
+    ("type_kw", frozenset({"expected", "got"}), None, BugType.TYPE_ERROR),
+    # Linting (if caught by linter or style checker)
+    ("lint", None, None, BugType.LINTING),
+)
+
 
 @dataclass
 class ParsedFailure:
@@ -23,8 +84,8 @@ class FailureParserAgent:
         
         NO DEFAULTS - bug_type must be derived from actual error information.
         """
-        bug_type = self._classify_bug_type(error_type, message)
-        logger.debug(f"Classified {error_type} as {bug_type.value}: {message[:50]}")
+        bug_type = _classify_bug_type(error_type, message)
+        logger.debug("Classified %s as %s: %.50s", error_type, bug_type.value, message)
         
         return ParsedFailure(
             file=file,
@@ -34,47 +95,45 @@ class FailureParserAgent:
             error_type=error_type,
         )
     
-    def _classify_bug_type(self, error_type: str, message: str) -> BugType:
-        """Classify bug type based on Python error type and message.
-        
-        Priority:
-        1. Error type name (NameError, ImportError, etc.)
-        2. Message keywords
-        3. Only default to LOGIC if truly ambiguous
-        """
-        error_lower = error_type.lower()
-        message_lower = message.lower()
-        
-        # Import errors
-        if "importerror" in error_lower or "modulenotfounderror" in error_lower:
-            return BugType.IMPORT
-        if "import" in message_lower and ("cannot" in message_lower or "no module" in message_lower):
-            return BugType.IMPORT
-        # NameError for undefined names - often missing imports
-        if "nameerror" in error_lower and "is not defined" in message_lower:
-            return BugType.IMPORT
-        
-        # Syntax errors
-        if "syntaxerror" in error_lower or "invalidsyntax" in error_lower:
-            return BugType.SYNTAX
-        if "syntax" in message_lower:
-            return BugType.SYNTAX
-        
-        # Indentation errors
-        if "indentationerror" in error_lower or "taberror" in error_lower:
-            return BugType.INDENTATION
-        if "indent" in message_lower or "unexpected indent" in message_lower:
-            return BugType.INDENTATION
-        
-        # Type errors
-        if "typeerror" in error_lower or "attributeerror" in error_lower:
-            return BugType.TYPE_ERROR
-        if "type" in message_lower and ("expected" in message_lower or "got" in message_lower):
-            return BugType.TYPE_ERROR
-        
-        # Linting (if caught by linter or style checker)
-        if "lint" in message_lower or "flake8" in message_lower or "pylint" in message_lower:
-            return BugType.LINTING
-        
-        # Default to LOGIC for assertion errors, value errors, name errors, etc.
-        return BugType.LOGIC
+
+def _classify_bug_type(error_type: str, message: str) -> BugType:
+    """Classify bug type based on Python error type and message.
+
+    Priority:
+    1. Error type name (NameError, ImportError, etc.)
+    2. Message keywords
+    3. Only default to LOGIC if truly ambiguous
+    """
+    bug_type = _ERROR_TYPE_MAP.get(error_type)
+    if bug_type is not None:
+        return bug_type
+
+    # Lower once and strip volatile tokens; the cached heuristic layer is
+    # keyed on the normalized pair so recurring failures that differ only
+    # in path/line/address share one entry.
+    return _classify_lowered(error_type.lower(), _VOLATILE_TOKENS_RE.sub("", message.lower()))
+
+
+@functools.lru_cache(maxsize=2048)
+def _classify_lowered(error_lower: str, message_lower: str) -> BugType:
+    """Keyword heuristics over pre-lowered strings; memoized since the
+    same failure text recurs across many tests in one run."""
+    # Error type name resolves most classifications in one regex pass
+    match = _ERRTYPE_RE.search(error_lower)
+    if match:
+        return BugType[match.lastgroup]
+
+    # One scan over the message, then a single walk of the rule table
+    hits = {m.lastgroup for m in _MSG_KEYWORDS_RE.finditer(message_lower)}
+
+    for primary, any_of, error_needle, bug_type in _MESSAGE_RULES:
+        if primary not in hits:
+            continue
+        if any_of is not None and not (any_of & hits):
+            continue
+        if error_needle is not None and error_needle not in error_lower:
+            continue
+        return bug_type
+
+    # Default to LOGIC for assertion errors, value errors, name errors, etc.
+    return BugType.LOGIC
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import ast
 from dataclasses import dataclass
 import logging
 import os
@@ -11,6 +10,13 @@ from models import BugType
 
 logger = logging.getLogger(__name__)
 
+# Hoisted patterns so hot paths dispatch straight to compiled matchers
+# instead of hashing into re's internal cache on every call.
+_NO_MODULE_RE = re.compile(r"no module named ['\"]?(\w+)['\"]?")
+_NAME_NOT_DEFINED_RE = re.compile(r"name ['\"]?(\w+)['\"]? is not defined")
+_ASSERT_EQ_RE = re.compile(r"assert\s+(\w+)\s*==\s*(\d+)")
+_STRICT_OUTPUT_RE = re.compile(r"^[A-Z_]+ error in .+ line \d+ → Fix: .+$")
+
 
 @dataclass
 class FixProposal:
@@ -59,31 +65,32 @@ class FixAgent:
             logger.error(f"File does not exist: {file_path}")
             return False
         
-        # Read current file content
+        # Read a window around the failing line; the heuristics never look
+        # further than a few lines past it, so the tail of the file stays
+        # one unsplit block instead of a list of per-line objects.
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            original_lines = original_content.splitlines()
+            lines, tail = self._read_window(file_path, line_number)
         except Exception as e:
             logger.error(f"Failed to read file {file_path}: {e}")
             return False
-        
+        original_head = ''.join(lines)
+
         # Validate line number
-        if line_number < 1 or line_number > len(original_lines):
-            logger.error(f"Invalid line number {line_number} for file with {len(original_lines)} lines")
+        if line_number < 1 or line_number > len(lines):
+            logger.error(f"Invalid line number {line_number} for file with {len(lines)} lines")
             return False
-        
+
         # Get context around the error (5 lines before and after)
         context_start = max(0, line_number - 6)
-        context_end = min(len(original_lines), line_number + 5)
-        context_lines = original_lines[context_start:context_end]
-        context_str = '\n'.join(f"{i+context_start+1}: {line}" for i, line in enumerate(context_lines))
-        
+        context_end = min(len(lines), line_number + 5)
+        context_lines = lines[context_start:context_end]
+        context_str = '\n'.join(f"{i+context_start+1}: {line.rstrip()}" for i, line in enumerate(context_lines))
+
         logger.debug(f"Context around line {line_number}:\n{context_str}")
-        
+
         # Generate fix using LLM or heuristics
-        fixed_content = self._generate_fixed_content(
-            original_content=original_content,
+        fixed_lines = self._generate_fixed_content(
+            lines=lines,
             file_path=str(file),
             line_number=line_number,
             bug_type=bug_type,
@@ -91,43 +98,71 @@ class FixAgent:
             message=message,
             context_str=context_str
         )
-        
-        if not fixed_content or fixed_content == original_content:
+
+        if fixed_lines is None:
             logger.warning(f"No fix generated for {file}:{line_number}")
             return False
+
+        fixed_head = ''.join(fixed_lines)
+        if fixed_head == original_head:
+            logger.warning(f"No fix generated for {file}:{line_number}")
+            return False
+        fixed_content = fixed_head + tail
         
-        # Validate Python syntax
+        # Validate Python syntax; compile() runs the parser without
+        # materializing an AST node tree the way ast.parse would
         try:
-            ast.parse(fixed_content)
+            compile(fixed_content, str(file_path), 'exec', dont_inherit=True)
             logger.debug("Fixed content passes syntax validation")
         except SyntaxError as e:
             logger.error(f"Fixed content has syntax error: {e}")
             return False
         
-        # Write fixed content
+        # Write fixed content atomically: a crash mid-write must never
+        # leave a torn source file for the next iteration to choke on
+        tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with open(tmp_path, 'w', encoding='utf-8', buffering=max(8192, len(fixed_content))) as f:
                 f.write(fixed_content)
+            os.replace(tmp_path, file_path)
             logger.info(f"Successfully applied fix to {file}")
             return True
         except Exception as e:
             logger.error(f"Failed to write fixed content to {file_path}: {e}")
+            tmp_path.unlink(missing_ok=True)
             return False
     
+    def _read_window(self, file_path: Path, line_number: int, radius: int = 10) -> tuple[list[str], str]:
+        """Read the file lazily, splitting only up to line_number + radius lines.
+
+        Returns (head_lines, tail) where head_lines are keepends lines
+        covering the window the heuristics actually inspect and tail is
+        the untouched remainder of the file as a single string.
+        """
+        head: list[str] = []
+        limit = line_number + radius
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                head.append(line)
+                if len(head) >= limit:
+                    break
+            tail = f.read()
+        return head, tail
+
     def _generate_fixed_content(
-        self, 
-        original_content: str, 
-        file_path: str, 
-        line_number: int, 
+        self,
+        lines: list[str],
+        file_path: str,
+        line_number: int,
         bug_type: BugType,
         error_type: str,
         message: str,
         context_str: str
-    ) -> str:
-        """Generate fixed file content using rule-based heuristics."""
+    ) -> list[str] | None:
+        """Generate fixed file content (as keepends lines) using rule-based heuristics."""
         logger.info(f"Generating fix using heuristics for {bug_type.value} - {error_type}")
         return self._generate_fix_with_heuristics(
-            original_content, line_number, bug_type, error_type, message
+            lines, line_number, bug_type, error_type, message
         )
     
     def _generate_deterministic_fix(self, bug_type: BugType) -> str:
@@ -162,8 +197,7 @@ class FixAgent:
         - IMPORT error in test.py line 5 → Fix: add the missing import statement
         - SYNTAX error in utils.py line 12 → Fix: add the missing colon at the correct position
         """
-        pattern = r"^[A-Z_]+ error in .+ line \d+ → Fix: .+$"
-        if not re.match(pattern, strict_output):
+        if not _STRICT_OUTPUT_RE.match(strict_output):
             raise Exception(f"Strict output format violation: {strict_output}")
         
         logger.info(f"✅ Strict output format validated: {strict_output[:60]}...")
@@ -178,36 +212,39 @@ class FixAgent:
     
     def _generate_fix_with_heuristics(
         self,
-        original_content: str,
+        lines: list[str],
         line_number: int,
         bug_type: BugType,
         error_type: str,
         message: str
-    ) -> str:
-        """Rule-based fixes for common errors."""
-        
-        lines = original_content.splitlines(keepends=True)
+    ) -> list[str] | None:
+        """Rule-based fixes for common errors.
+
+        Operates on the keepends line list split once by apply_fix;
+        returns a new/modified line list, or None when no fix is available.
+        """
+
         message_lower = message.lower()
         error_lower = error_type.lower()
-        
+
         # Import errors
         if bug_type == BugType.IMPORT or "import" in error_lower:
             # ModuleNotFoundError - package not installed, can't fix with code changes
             if "modulenotfounderror" in error_lower or ("no module named" in message_lower and "import" not in message_lower):
                 logger.info(f"Skipping ModuleNotFoundError - package needs to be installed, not imported: {message}")
-                return ""  # Return empty string to indicate no fix available
-            
+                return None  # No fix available
+
             # Extract missing module name for ImportError (wrong import statement)
             if "no module named" in message_lower and "import" in message_lower:
-                match = re.search(r"no module named ['\"]?(\w+)['\"]?", message_lower)
+                match = _NO_MODULE_RE.search(message_lower)
                 if match:
                     module_name = match.group(1)
                     # Add import at the top
-                    return f"import {module_name}\n\n{original_content}"
-            
+                    return [f"import {module_name}\n", "\n", *lines]
+
             # Name not defined - might need import
             if "name" in message_lower and "is not defined" in message_lower:
-                match = re.search(r"name ['\"]?(\w+)['\"]? is not defined", message_lower)
+                match = _NAME_NOT_DEFINED_RE.search(message_lower)
                 if match:
                     name = match.group(1)
                     # Common imports
@@ -227,27 +264,27 @@ class FixAgent:
                     }
                     if name.lower() in common_imports:
                         logger.info(f"Adding import for {name}")
-                        return f"{common_imports[name.lower()]}\n\n{original_content}"
-        
+                        return [f"{common_imports[name.lower()]}\n", "\n", *lines]
+
         # Syntax errors - try to fix common issues
         if bug_type == BugType.SYNTAX:
             if line_number > 0 and line_number <= len(lines):
                 line = lines[line_number - 1]
-                
+
                 # Missing colon
                 if "expected ':'" in message_lower or "invalid syntax" in message_lower:
                     if line.strip() and not line.rstrip().endswith(':'):
                         if any(keyword in line for keyword in ['def ', 'class ', 'if ', 'elif ', 'else', 'for ', 'while ', 'try', 'except', 'finally', 'with ']):
                             lines[line_number - 1] = line.rstrip() + ':\n'
-                            return ''.join(lines)
-                
+                            return lines
+
                 # Unclosed parenthesis/bracket
                 if "unclosed" in message_lower or "unmatched" in message_lower:
                     open_count = line.count('(') - line.count(')')
                     if open_count > 0:
                         lines[line_number - 1] = line.rstrip() + ')' * open_count + '\n'
-                        return ''.join(lines)
-        
+                        return lines
+
         # Indentation errors
         if bug_type == BugType.INDENTATION:
             if line_number > 0 and line_number <= len(lines):
@@ -257,40 +294,40 @@ class FixAgent:
                     prev_indent = len(prev_line) - len(prev_line.lstrip())
                     current_line = lines[line_number - 1]
                     current_content = current_line.lstrip()
-                    
+
                     # Common case: same indent as previous line
                     lines[line_number - 1] = ' ' * prev_indent + current_content
-                    return ''.join(lines)
-        
+                    return lines
+
         # Type errors - try to fix common type issues
         if bug_type == BugType.TYPE_ERROR:
             if line_number > 0 and line_number <= len(lines):
                 line = lines[line_number - 1]
-                
+
                 # String concatenation with non-string
                 if "can only concatenate str" in message_lower or "unsupported operand type" in message_lower:
                     # Try to add str() conversion
                     # This is a simple heuristic - in real code this would need AST manipulation
                     pass
-        
+
         # Logic errors (assertions, value errors, etc.)
         if bug_type == BugType.LOGIC:
             if "assert" in error_lower or "assertion" in error_lower:
                 if line_number > 0 and line_number <= len(lines):
                     line = lines[line_number - 1]
-                    
+
                     # Simple assertion fix: if assert X == Y, try to understand the expected value
                     # For demonstration, we'll try to detect common patterns
-                    
+
                     # Example: assert result == 5 when result is 4
                     # Extract the expected value from the message
                     if "assert" in line.lower():
                         # Try to parse: assert X == Y
-                        match = re.search(r'assert\s+(\w+)\s*==\s*(\d+)', line)
+                        match = _ASSERT_EQ_RE.search(line)
                         if match:
                             var_name = match.group(1)
                             expected = match.group(2)
-                            
+
                             # Look backwards for where var_name is assigned
                             for i in range(line_number - 2, max(0, line_number - 10), -1):
                                 if i < len(lines) and var_name in lines[i]:
@@ -299,7 +336,7 @@ class FixAgent:
                                     # But we can at least detect it
                                     logger.debug(f"Found {var_name} assignment at line {i+1}")
                                     break
-        
+
         # If no specific fix found, return original
         logger.warning(f"No heuristic fix available for {bug_type.value} - {error_type}")
-        return ""
+        return None
@@ -4,10 +4,22 @@ import logging
 import os
 import re
 
-from git import Repo
+from git import GitCommandError, Repo
+
+from .git_credentials import git_credential_env
 
 logger = logging.getLogger(__name__)
 
+# Single C-level pass: spaces become underscores, every other character
+# outside A-Z/_ is dropped. Inputs are ASCII (validated upstream), so a
+# 0-255 table is sufficient.
+_NORMALIZE_TABLE = str.maketrans(
+    " ",
+    "_",
+    "".join(c for c in map(chr, range(256)) if not ("A" <= c <= "Z") and c not in " _"),
+)
+_MULTI_US_RE = re.compile(r"_+")
+
 
 class GitAgent:
     BRANCH_PATTERN = re.compile(r"^[A-Z_]+_AI_Fix$")
@@ -26,7 +38,9 @@ class GitAgent:
         return f"{normalized_team}_{normalized_leader}_AI_Fix"
 
     def validate_branch_name(self, branch_name: str) -> bool:
-        return bool(self.BRANCH_PATTERN.fullmatch(branch_name)) and branch_name.endswith("_AI_Fix")
+        # The pattern already anchors on the _AI_Fix suffix, so the single
+        # precompiled fullmatch is the whole check.
+        return bool(self.BRANCH_PATTERN.fullmatch(branch_name))
 
     def validate_commit_prefix(self, commit_message: str) -> bool:
         return commit_message.startswith(self.COMMIT_PREFIX)
@@ -48,44 +62,56 @@ class GitAgent:
         self.ensure_not_main_branch(branch_name)
 
         repo = Repo(repo_path)
-        
-        # Check if branch exists locally or remotely
-        existing_local = {head.name for head in repo.heads}
-        existing_remote = {ref.name.split("origin/")[-1] for ref in repo.remote().refs} if repo.remotes else set()
-        
-        if branch_name in existing_local or branch_name in existing_remote:
-            logger.error(f"❌ STRICT ENFORCEMENT: Branch '{branch_name}' already exists. Cannot modify branch name.")
+        # ls_remote talks to origin, and the remote URL is token-free, so
+        # credentials must come in via GIT_ASKPASS here just like push.
+        repo.git.update_environment(**git_credential_env(self.github_token))
+
+        # Targeted existence checks - O(1) git calls instead of
+        # materializing every local head and remote ref into Python sets.
+        try:
+            repo.git.rev_parse("--verify", "--quiet", f"refs/heads/{branch_name}")
+            exists = True
+        except GitCommandError:
+            exists = False
+        if not exists and repo.remotes:
+            exists = bool(repo.git.ls_remote("--heads", "origin", branch_name).strip())
+
+        if exists:
+            logger.error("❌ STRICT ENFORCEMENT: Branch '%s' already exists. Cannot modify branch name.", branch_name)
             raise ValueError(f"Branch '{branch_name}' already exists. Strict naming requires exact TEAM_NAME_LEADER_NAME_AI_Fix format with NO modifications.")
-        
-        # Create branch with exact name (strict mode)
-        if branch_name in [head.name for head in repo.heads]:
-            repo.git.checkout(branch_name)
-        else:
-            repo.git.checkout("-b", branch_name)
-
-        logger.info(f"✅ Branch created with strict name: {branch_name}")
+
+        # Create branch with exact name (strict mode); the existence check
+        # above already guarantees it is new, so no need to re-scan heads.
+        repo.git.checkout("-b", branch_name)
+
+        logger.info("✅ Branch created with strict name: %s", branch_name)
         return branch_name
 
     def commit_all_changes(self, repo_path: str, commit_message: str) -> bool:
         self.enforce_commit_prefix(commit_message)
         repo = Repo(repo_path)
         repo.git.add(A=True)
-        if not repo.is_dirty(untracked_files=True):
-            return False
-        repo.index.commit(commit_message)
-        return True
+        # 'diff --cached --quiet' answers "anything staged?" via exit code
+        # alone - no second working-tree scan like is_dirty would do.
+        try:
+            repo.git.diff("--cached", "--quiet")
+        except GitCommandError:
+            repo.index.commit(commit_message)
+            return True
+        return False
 
     def push_branch(self, repo_path: str, branch_name: str) -> None:
         self.ensure_not_main_branch(branch_name)
-        
+
         # GITHUB_TOKEN is mandatory (checked in __init__)
         if not self.github_token:
             raise Exception("GITHUB_TOKEN is required for autonomous execution.")
-        
+
         repo = Repo(repo_path)
+        # Token travels via GIT_ASKPASS - never in argv or the remote URL.
+        repo.git.update_environment(**git_credential_env(self.github_token))
         repo.git.push("origin", branch_name)
 
     def _normalize(self, value: str) -> str:
-        uppercase = value.upper().replace(" ", "_")
-        normalized = re.sub(r"[^A-Z_]", "", uppercase)
-        return re.sub(r"_+", "_", normalized).strip("_")
+        normalized = value.upper().translate(_NORMALIZE_TABLE)
+        return _MULTI_US_RE.sub("_", normalized).strip("_")
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import os
+import stat
+import tempfile
+
+# Replies to git's credential prompts: the username is the fixed
+# x-access-token marker GitHub expects for token auth and the password is
+# the token itself, read from the environment at prompt time.
+_ASKPASS_SCRIPT = """#!/bin/sh
+case "$1" in
+    Username*) echo "x-access-token" ;;
+    Password*) echo "${GIT_PASSWORD}" ;;
+esac
+"""
+
+_askpass_path: str | None = None
+
+
+def _askpass_script() -> str:
+    global _askpass_path
+    if _askpass_path is None or not os.path.exists(_askpass_path):
+        fd, path = tempfile.mkstemp(prefix="git-askpass-", suffix=".sh")
+        with os.fdopen(fd, "w") as handle:
+            handle.write(_ASKPASS_SCRIPT)
+        os.chmod(path, stat.S_IRWXU)
+        _askpass_path = path
+    return _askpass_path
+
+
+def git_credential_env(github_token: str) -> dict[str, str]:
+    """Git environment that supplies the GitHub token via GIT_ASKPASS.
+
+    Keeps the token out of subprocess argv (visible in ps) and out of the
+    remote URL that git persists in .git/config. The askpass script is
+    written once per process and reused by every clone/fetch/push.
+    """
+    return {
+        "GIT_ASKPASS": _askpass_script(),
+        "GIT_PASSWORD": github_token,
+        "GIT_TERMINAL_PROMPT": "0",
+    }
@@ -1,23 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
-import json
+import hashlib
+from itertools import islice
 import logging
+import os
 from pathlib import Path
+import shutil
+import time
 from uuid import uuid4
 
-from models import CITimelineRecord, FixRecord, FixStatus, ResultsSchema, RunAgentRequest, RunState, RunStatus
+import orjson
+
+from models import BugType, CITimelineRecord, FixRecord, FixStatus, ResultsSchema, RunAgentRequest, RunState, RunStatus
 from run_store import run_store
 from .repo_agent import RepoAgent
 from .test_agent import TestAgent
 from .failure_parser_agent import FailureParserAgent
 from .fix_agent import FixAgent
 from .git_agent import GitAgent
-from .ci_agent import CIAgent
-from .score_agent import ScoreAgent
+from .ci_agent import CIAgent, build_github_client
+from .score_agent import calculate_score
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on failures fixed concurrently within one iteration; keeps
+# the fan-out polite toward downstream services (LLM APIs, disk).
+_MAX_CONCURRENT_FIXES = 8
+
 
 class OrchestratorAgent:
     def __init__(self, retry_limit: int) -> None:
@@ -27,10 +38,19 @@ class OrchestratorAgent:
         self.failure_parser_agent = FailureParserAgent()
         self.fix_agent = FixAgent()
         self.git_agent = GitAgent()
-        self.ci_agent = CIAgent()
-        self.score_agent = ScoreAgent()
+        # One pooled HTTP/2 client shared by every run on the server's
+        # event loop: a single TCP+TLS handshake serves all CI polls.
+        self._http = build_github_client(os.getenv("GITHUB_TOKEN", ""))
+        self.ci_agent = CIAgent(http=self._http)
         self._project_root = Path(__file__).resolve().parents[2]
         self._results_dir = self._project_root / "results"
+        # Digest of the last payload written per run, to skip
+        # byte-identical rewrites of the same results file.
+        self._last_results_hash: dict[str, bytes] = {}
+
+    async def aclose(self) -> None:
+        """Release the shared HTTP client; called from the server's shutdown hook."""
+        await self._http.aclose()
 
     def start_run(self, payload: RunAgentRequest) -> RunState:
         run_id = str(uuid4())
@@ -60,51 +80,63 @@ class OrchestratorAgent:
         return run_store.get(run_id)
 
     def execute_run(self, run_id: str, payload: RunAgentRequest) -> None:
+        """Synchronous entry point kept for back-compat; delegates to the async pipeline."""
+        asyncio.run(self.execute_run_async(run_id, payload))
+
+    async def execute_run_async(self, run_id: str, payload: RunAgentRequest) -> None:
         run_state = run_store.get(run_id)
         if run_state is None:
             return
 
+        # Wall clock for display; monotonic for duration math so the
+        # reported execution time is immune to NTP/DST clock jumps.
+        start_mono = time.monotonic()
         started_at = datetime.now(timezone.utc)
-        logger.info(f"Starting run {run_id} for repository {payload.repo_url}")
-        
+        # Running count of recorded fixes - appends to results.fixes are
+        # matched by a counter bump so totals never need len() rescans.
+        fixes_recorded = 0
+        logger.info("Starting run %s for repository %s", run_id, payload.repo_url)
+
         try:
-            repo_info = self.repo_agent.analyze_repository(str(payload.repo_url), run_id)
-            logger.info(f"Repository cloned to {repo_info.repo_path}")
-            logger.info(f"🔍 DEBUG: ===== REPOSITORY CLONING COMPLETE =====")
-            logger.info(f"🔍 DEBUG: repo_path = {repo_info.repo_path}")
-            logger.info(f"🔍 DEBUG: language = {repo_info.language}")
-            
-            # List all files in repo
-            import os
-            try:
-                all_files = []
-                for root, dirs, files in os.walk(repo_info.repo_path):
-                    for file in files:
-                        all_files.append(os.path.join(root, file))
-                logger.info(f"🔍 DEBUG: Total files in repo: {len(all_files)}")
-                logger.info(f"🔍 DEBUG: First 20 files: {all_files[:20]}")
-            except Exception as e:
-                logger.error(f"🔍 DEBUG: Error walking repo: {e}")
-            
-            active_branch = self.git_agent.checkout_or_create_branch(
+            # Blocking agent calls (git, pytest subprocess, file I/O) run in
+            # worker threads so the event loop can multiplex other runs; the
+            # CI poll is natively async and awaited directly.
+            repo_info = await asyncio.to_thread(self.repo_agent.analyze_repository, str(payload.repo_url), run_id)
+            logger.info("Repository cloned to %s (language=%s)", repo_info.repo_path, repo_info.language)
+            if logger.isEnabledFor(logging.DEBUG):
+                # Sample a handful of paths lazily - never walk the whole
+                # tree just to produce a log line.
+                sample = list(islice(Path(repo_info.repo_path).rglob("*"), 20))
+                logger.debug("Sample of cloned files: %s", sample)
+
+            active_branch = await asyncio.to_thread(
+                self.git_agent.checkout_or_create_branch,
                 repo_path=repo_info.repo_path,
                 branch_name=run_state.results.branch_name,
                 run_id=run_id,
             )
             run_state.results.branch_name = active_branch
             run_state.results.iterations_used = 0
-            logger.info(f"Checked out branch {active_branch}")
+            logger.info("Checked out branch %s", active_branch)
+
+            # Signature of the previous iteration's failures, used to detect
+            # a stuck loop: identical failures with nothing fixed means more
+            # iterations would only burn test runs and CI polls.
+            prev_failure_sig: frozenset | None = None
+            prev_fixes_applied = -1
 
             for iteration in range(1, self.retry_limit + 1):
-                logger.info(f"=== Iteration {iteration}/{self.retry_limit} ===")
+                logger.info("=== Iteration %d/%d ===", iteration, self.retry_limit)
                 run_state.results.iterations_used = iteration
-                run_store.upsert(run_state)
+                # Intra-iteration progress write - batched; the flushing
+                # upsert at the iteration boundary persists it.
+                run_store.upsert(run_state, flush=False)
 
                 # Run tests
-                test_result = self.test_agent.run_tests(repo_info.repo_path)
+                test_result = await asyncio.to_thread(self.test_agent.run_tests, repo_info.repo_path)
                 
                 if test_result.passed:
-                    logger.info(f"All tests passed in iteration {iteration}")
+                    logger.info("All tests passed in iteration %d", iteration)
                     
                     # Check if this is a local file:// URL (skip push/CI for local testing)
                     is_local_repo = str(payload.repo_url).startswith("file://")
@@ -117,14 +149,14 @@ class OrchestratorAgent:
                             CITimelineRecord(
                                 iteration=iteration,
                                 status=RunStatus.PASSED,
-                                timestamp=datetime.now(timezone.utc).isoformat(),
+                                timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds"),
                             )
                         )
                         logger.info("All tests passed for local repo - run complete")
                         break
                     
                     # For remote repos, push and monitor CI
-                    ci_status = self._push_and_monitor_ci(
+                    ci_status = await self._push_and_monitor_ci(
                         repo_path=repo_info.repo_path,
                         repo_url=str(payload.repo_url),
                         branch_name=run_state.results.branch_name,
@@ -141,69 +173,89 @@ class OrchestratorAgent:
                         run_state.results.final_status = RunStatus.PASSED
                         logger.info("CI passed - run complete")
                         break
-                    logger.warning(f"Tests passed locally but CI failed: {ci_status.details}")
+                    logger.warning("Tests passed locally but CI failed: %s", ci_status.details)
                     run_store.upsert(run_state)
                     continue
 
                 # Tests failed - parse and fix failures
-                logger.info(f"Tests failed with {len(test_result.failures)} failure(s)")
+                logger.info("Tests failed with %d failure(s)", len(test_result.failures))
                 run_state.results.total_failures += len(test_result.failures)
+
+                failure_sig = frozenset(
+                    (failure.file, failure.line_number, failure.error_type)
+                    for failure in test_result.failures
+                )
+                if failure_sig == prev_failure_sig and prev_fixes_applied == 0:
+                    logger.warning("Identical failures with no fixes applied - failing fast instead of retrying")
+                    run_state.status = RunStatus.FAILED
+                    run_state.results.final_status = RunStatus.FAILED
+                    run_state.results.ci_timeline.append(
+                        CITimelineRecord(
+                            iteration=iteration,
+                            status=RunStatus.FAILED,
+                            timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        )
+                    )
+                    break
+                prev_failure_sig = failure_sig
                 
-                fixes_applied = 0
+                # One broken import can fail dozens of tests at the same
+                # file:line - fix each unique location once, then fan the
+                # shared outcome back out to every original failure.
+                unique_failures: dict[tuple[str, int, str], object] = {}
                 for failure in test_result.failures:
-                    logger.debug(f"Processing failure: {failure.file}:{failure.line_number} - {failure.error_type}")
-                    
-                    # Parse failure with error_type
-                    parsed = self.failure_parser_agent.parse_failure(
-                        file=failure.file,
-                        line_number=failure.line_number,
-                        message=failure.message,
-                        error_type=failure.error_type,
-                    )
-                    
-                    logger.info(f"Classified as {parsed.bug_type.value}: {failure.file}:{failure.line_number}")
-                    
-                    # Apply actual fix to file
-                    fix_applied = self.fix_agent.apply_fix(
-                        repo_path=repo_info.repo_path,
-                        file=parsed.file,
-                        line_number=parsed.line_number,
-                        bug_type=parsed.bug_type,
-                        message=parsed.raw_message,
-                        error_type=parsed.error_type,
-                    )
-                    
-                    # Generate proposal metadata for tracking
-                    proposal = self.fix_agent.generate_fix(
-                        file=parsed.file,
-                        line_number=parsed.line_number,
-                        bug_type=parsed.bug_type,
-                        message=parsed.raw_message,
+                    unique_failures.setdefault((failure.file, failure.line_number, failure.error_type), failure)
+
+                # Fixes in different files are independent, so fan out per
+                # file: iteration fix time is max over files instead of the
+                # sum. Fixes within one file must stay sequential - each
+                # apply_fix rewrites the whole file, so concurrent edits at
+                # different lines would silently revert each other.
+                failures_by_file: dict[str, list] = {}
+                for failure in unique_failures.values():
+                    failures_by_file.setdefault(failure.file, []).append(failure)
+
+                semaphore = asyncio.Semaphore(_MAX_CONCURRENT_FIXES)
+                file_outcomes = await asyncio.gather(
+                    *(
+                        self._handle_file_failures(repo_info.repo_path, group, semaphore)
+                        for group in failures_by_file.values()
                     )
-                    
-                    self.git_agent.enforce_commit_prefix(proposal.commit_message)
-                    
-                    fix_status = FixStatus.FIXED if fix_applied else FixStatus.FAILED
-                    if fix_applied:
-                        fixes_applied += 1
-                    
-                    logger.info(f"Fix {'applied' if fix_applied else 'failed'} for {parsed.file}:{parsed.line_number}")
-                    
-                    run_state.results.fixes.append(
-                        FixRecord(
-                            file=proposal.file,
-                            bug_type=proposal.bug_type,
-                            line_number=proposal.line_number,
-                            commit_message=proposal.commit_message,
-                            status=fix_status,
-                            strict_output=proposal.strict_output,
+                )
+                outcome_by_key: dict[tuple[str, int, str], object] = {}
+                for mapping in file_outcomes:
+                    outcome_by_key.update(mapping)
+                fixes_applied = sum(
+                    1
+                    for outcome in outcome_by_key.values()
+                    if not isinstance(outcome, BaseException) and outcome[1]
+                )
+
+                for failure in test_result.failures:
+                    outcome = outcome_by_key[(failure.file, failure.line_number, failure.error_type)]
+                    if isinstance(outcome, BaseException):
+                        logger.error("Fix pipeline failed for %s:%d: %s", failure.file, failure.line_number, outcome)
+                        run_state.results.fixes.append(
+                            FixRecord(
+                                file=failure.file,
+                                bug_type=BugType.LOGIC,
+                                line_number=failure.line_number,
+                                commit_message="[AI-AGENT] Fix attempt failed",
+                                status=FixStatus.FAILED,
+                                strict_output=f"LOGIC error in {failure.file} line {failure.line_number} → Fix: attempt failed ({outcome})",
+                            )
                         )
-                    )
+                        continue
+                    record, _ = outcome
+                    run_state.results.fixes.append(record)
+                fixes_recorded += len(test_result.failures)
+                prev_fixes_applied = fixes_applied
 
                 # Commit changes if any fixes were applied
                 if fixes_applied > 0:
-                    logger.info(f"Committing {fixes_applied} fix(es)")
-                    committed = self.git_agent.commit_all_changes(
+                    logger.info("Committing %d fix(es)", fixes_applied)
+                    committed = await asyncio.to_thread(
+                        self.git_agent.commit_all_changes,
                         repo_path=repo_info.repo_path,
                         commit_message=f"[AI-AGENT] Apply {fixes_applied} autonomous fix(es)",
                     )
@@ -214,12 +266,12 @@ class OrchestratorAgent:
                     logger.warning("No fixes were applied successfully")
 
                 # Push and monitor CI
-                ci_status = self._push_and_monitor_ci(
+                ci_status = await self._push_and_monitor_ci(
                     repo_path=repo_info.repo_path,
                     repo_url=str(payload.repo_url),
                     branch_name=run_state.results.branch_name,
                 )
-                run_state.results.total_fixes = len(run_state.results.fixes)
+                run_state.results.total_fixes = fixes_recorded
                 run_state.results.ci_timeline.append(
                     CITimelineRecord(
                         iteration=iteration,
@@ -234,24 +286,24 @@ class OrchestratorAgent:
                     run_store.upsert(run_state)
                     break
                 
-                logger.info(f"Iteration {iteration} complete - CI status: {ci_status.status}")
+                logger.info("Iteration %d complete - CI status: %s", iteration, ci_status.status)
                 run_store.upsert(run_state)
 
             if run_state.status != RunStatus.PASSED:
                 run_state.status = RunStatus.FAILED
                 run_state.results.final_status = RunStatus.FAILED
-                logger.warning(f"Run failed after {self.retry_limit} iterations")
+                logger.warning("Run failed after %d iterations", self.retry_limit)
 
         except Exception as e:
-            logger.error(f"Run failed with exception: {e}", exc_info=True)
+            logger.error("Run failed with exception: %s", e, exc_info=True)
             run_state.status = RunStatus.FAILED
             run_state.results.final_status = RunStatus.FAILED
         finally:
             finished_at = datetime.now(timezone.utc)
             run_state.finished_at = finished_at
-            run_state.results.total_fixes = len(run_state.results.fixes)
-            run_state.results.execution_time_seconds = int((finished_at - started_at).total_seconds())
-            score_breakdown = self.score_agent.calculate_score(
+            run_state.results.total_fixes = fixes_recorded
+            run_state.results.execution_time_seconds = int(time.monotonic() - start_mono)
+            score_breakdown = calculate_score(
                 execution_time_seconds=run_state.results.execution_time_seconds,
                 commits=run_state.results.commits,
             )
@@ -260,17 +312,108 @@ class OrchestratorAgent:
             run_state.results.score_commit_penalty = score_breakdown.commit_penalty
             run_state.results.score = score_breakdown.final_score
             run_store.upsert(run_state)
-            self._persist_results(run_state)
-            logger.info(f"Run {run_id} complete - Status: {run_state.status}, Score: {run_state.results.score}")
+            await asyncio.to_thread(self._persist_results, run_state)
+            # The run's checkout is done with - drop it so its cache entry
+            # no longer counts as live and can age out of the clone cache.
+            await asyncio.to_thread(self.repo_agent.cleanup_run, run_id)
+            logger.info("Run %s complete - Status: %s, Score: %d", run_id, run_state.status, run_state.results.score)
+
+    async def _handle_file_failures(
+        self, repo_path: str, failures: list, semaphore: asyncio.Semaphore
+    ) -> dict[tuple[str, int, str], object]:
+        """Apply every fix targeting one file, in order, one at a time.
+
+        Later fixes build on the file contents the earlier ones wrote.
+        Exceptions are captured per failure so one bad fix doesn't sink
+        the rest of the file's batch.
+        """
+        outcomes: dict[tuple[str, int, str], object] = {}
+        for failure in failures:
+            key = (failure.file, failure.line_number, failure.error_type)
+            try:
+                outcomes[key] = await self._handle_failure(repo_path, failure, semaphore)
+            except Exception as exc:
+                outcomes[key] = exc
+        return outcomes
+
+    async def _handle_failure(self, repo_path: str, failure, semaphore: asyncio.Semaphore) -> tuple[FixRecord, bool]:
+        """Parse, fix and record one failure; runs concurrently per failure."""
+        async with semaphore:
+            logger.debug("Processing failure: %s:%d - %s", failure.file, failure.line_number, failure.error_type)
+
+            # Parse failure with error_type
+            parsed = self.failure_parser_agent.parse_failure(
+                file=failure.file,
+                line_number=failure.line_number,
+                message=failure.message,
+                error_type=failure.error_type,
+            )
 
-    def _push_and_monitor_ci(self, repo_path: str, repo_url: str, branch_name: str):
-        self.git_agent.push_branch(repo_path=repo_path, branch_name=branch_name)
-        return self.ci_agent.poll_workflow_status(repo_url=repo_url, branch_name=branch_name)
+            logger.info("Classified as %s: %s:%d", parsed.bug_type.value, failure.file, failure.line_number)
+
+            # Apply actual fix to file
+            fix_applied = await asyncio.to_thread(
+                self.fix_agent.apply_fix,
+                repo_path=repo_path,
+                file=parsed.file,
+                line_number=parsed.line_number,
+                bug_type=parsed.bug_type,
+                message=parsed.raw_message,
+                error_type=parsed.error_type,
+            )
+
+            # Generate proposal metadata for tracking
+            proposal = self.fix_agent.generate_fix(
+                file=parsed.file,
+                line_number=parsed.line_number,
+                bug_type=parsed.bug_type,
+                message=parsed.raw_message,
+            )
+
+            self.git_agent.enforce_commit_prefix(proposal.commit_message)
+
+            logger.info("Fix %s for %s:%d", "applied" if fix_applied else "failed", parsed.file, parsed.line_number)
+
+            record = FixRecord(
+                file=proposal.file,
+                bug_type=proposal.bug_type,
+                line_number=proposal.line_number,
+                commit_message=proposal.commit_message,
+                status=FixStatus.FIXED if fix_applied else FixStatus.FAILED,
+                strict_output=proposal.strict_output,
+            )
+            return record, fix_applied
+
+    async def _push_and_monitor_ci(self, repo_path: str, repo_url: str, branch_name: str):
+        await asyncio.to_thread(self.git_agent.push_branch, repo_path=repo_path, branch_name=branch_name)
+        return await self.ci_agent.poll_workflow_status_async(repo_url=repo_url, branch_name=branch_name)
 
     def _persist_results(self, run_state: RunState) -> None:
         self._results_dir.mkdir(parents=True, exist_ok=True)
         run_result_file = self._results_dir / f"{run_state.run_id}.json"
         root_result_file = self._project_root / "results.json"
-        payload = run_state.results.model_dump(mode="json")
-        run_result_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-        root_result_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        # Serialize once with orjson (C-level, UTF-8 bytes); skip the disk
+        # entirely when nothing changed since the last persist.
+        data = orjson.dumps(run_state.results.model_dump(mode="json"), option=orjson.OPT_INDENT_2)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        # Keyed by run_id: two byte-identical runs still target different
+        # results/{run_id}.json files, so only a repeat persist of the
+        # same run may be skipped.
+        if self._last_results_hash.get(run_state.run_id) == digest:
+            return
+
+        # Write to a tempfile and os.replace so readers never observe a
+        # truncated file; the root copy is a hardlink when the filesystem
+        # allows it (no second data write), else a plain copy.
+        tmp_path = run_result_file.with_suffix(".json.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, run_result_file)
+
+        root_tmp = root_result_file.with_suffix(".json.tmp")
+        try:
+            root_tmp.unlink(missing_ok=True)
+            os.link(run_result_file, root_tmp)
+        except OSError:
+            shutil.copyfile(run_result_file, root_tmp)
+        os.replace(root_tmp, root_result_file)
+        self._last_results_hash[run_state.run_id] = digest
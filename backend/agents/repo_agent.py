@@ -1,16 +1,35 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import fcntl
+import hashlib
 import logging
 import os
 from pathlib import Path
 from shutil import rmtree
-from urllib.parse import urlparse, urlunparse
 
 from git import Repo
 
+from .git_credentials import git_credential_env
+
 logger = logging.getLogger(__name__)
 
+# Marker filenames that identify a project's language.
+_LANGUAGE_MARKERS = {
+    "pyproject.toml": "python",
+    "requirements.txt": "python",
+    "package.json": "javascript",
+}
+# Directories that can be huge and never hold language markers.
+_SKIP_DIRS = {".git", "node_modules", "venv", "__pycache__"}
+
+# Cached clones kept before the oldest is evicted.
+_CACHE_MAX_ENTRIES = int(os.getenv("REPO_CACHE_MAX_ENTRIES", "16"))
+
+# Escape hatch for debugging: keep finished runs' checkouts on disk
+# instead of deleting them (which also pins their cache entries).
+_KEEP_RUN_WORKSPACES = os.getenv("KEEP_RUN_WORKSPACES", "false").lower() == "true"
+
 
 @dataclass
 class RepoAgentResult:
@@ -21,63 +40,156 @@ class RepoAgentResult:
 class RepoAgent:
     def __init__(self) -> None:
         self._sandbox_root = Path(__file__).resolve().parents[1] / "sandbox"
+        self._cache_root = self._sandbox_root / "_cache"
         self.github_token = os.getenv("GITHUB_TOKEN")
         if not self.github_token:
             raise Exception("GITHUB_TOKEN is required for autonomous execution.")
-        logger.info(f"🔍 DEBUG: RepoAgent sandbox_root = {self._sandbox_root}")
-        logger.info(f"🔍 DEBUG: Absolute sandbox_root = {self._sandbox_root.absolute()}")
-        logger.info(f"✅ GITHUB_TOKEN configured for autonomous operations")
+        # Built once: every clone/fetch gets the token via GIT_ASKPASS, so
+        # remote URLs stay token-free.
+        self._git_env = git_credential_env(self.github_token)
+        logger.debug("RepoAgent sandbox_root = %s", self._sandbox_root)
+        logger.info("✅ GITHUB_TOKEN configured for autonomous operations")
 
     def analyze_repository(self, repo_url: str, run_id: str) -> RepoAgentResult:
         run_path = self._sandbox_root / run_id
-        logger.info(f"🔍 DEBUG: Cloning to run_path = {run_path}")
-        logger.info(f"🔍 DEBUG: Absolute run_path = {run_path.absolute()}")
-        
+        logger.debug("Cloning to run_path = %s", run_path)
+
         if run_path.exists():
-            logger.info(f"🔍 DEBUG: Removing existing run_path")
+            logger.debug("Removing existing run_path %s", run_path)
             rmtree(run_path)
 
         run_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Inject GitHub token for authenticated clone if available
-        clone_url = self._inject_token_if_github(repo_url)
-        logger.info(f"🔍 DEBUG: Starting clone from {repo_url}")
-        Repo.clone_from(clone_url, str(run_path))
-        logger.info(f"🔍 DEBUG: Clone complete")
-        
-        # List files in cloned repo
+        logger.debug("Starting clone from %s", repo_url)
         try:
-            files = list(os.listdir(run_path))
-            logger.info(f"🔍 DEBUG: Files in cloned repo: {files}")
-        except Exception as e:
-            logger.error(f"🔍 DEBUG: Error listing files: {e}")
-        
+            self._materialize_from_cache(repo_url, run_path)
+        except Exception as exc:
+            # Cache problems must never fail a run - fall back to a plain
+            # shallow clone straight into the run path.
+            logger.warning("Clone cache unavailable (%s); cloning directly", exc)
+            if run_path.exists():
+                rmtree(run_path)
+            self._shallow_clone(repo_url, run_path)
+        logger.debug("Clone complete")
+
         language = self._detect_language(run_path)
-        logger.info(f"🔍 DEBUG: Detected language: {language}")
-        logger.info(f"🔍 DEBUG: Returning repo_path: {str(run_path)}")
+        logger.debug("Detected language %s for %s", language, run_path)
         return RepoAgentResult(language=language, repo_path=str(run_path))
 
-    def _inject_token_if_github(self, repo_url: str) -> str:
-        """Inject GitHub token into HTTPS URL for authenticated operations."""
-        # Only inject token for GitHub URLs
-        if not repo_url.startswith(("https://github.com/", "http://github.com/")):
-            return repo_url
-        
-        # GITHUB_TOKEN is mandatory (checked in __init__)
-        if not self.github_token:
-            raise Exception("GITHUB_TOKEN is required for autonomous execution.")
-        
-        # Parse and inject token
-        parsed = urlparse(repo_url)
-        # Format: https://<token>@github.com/owner/repo.git
-        netloc = f"{self.github_token}@{parsed.netloc}"
-        authenticated_url = urlunparse(parsed._replace(netloc=netloc))
-        logger.info(f"✅ Injected token into clone URL for authenticated access")
-        return authenticated_url
+    def _shallow_clone(self, repo_url: str, target: Path) -> None:
+        # The agent only ever needs the current working tree of the default
+        # branch: shallow, single-branch, blobless clone keeps transfer at
+        # O(working tree) instead of full history.
+        Repo.clone_from(
+            repo_url,
+            str(target),
+            depth=1,
+            single_branch=True,
+            multi_options=["--filter=blob:none", "--no-tags"],
+            env=self._git_env,
+        )
+
+    def _materialize_from_cache(self, repo_url: str, run_path: Path) -> None:
+        """Produce run_path as a worktree of a cached clone of repo_url.
+
+        Repeat runs against the same repository skip the network clone
+        entirely: the cache is refreshed with one shallow fetch and the
+        run gets a detached worktree of the fetched HEAD. An exclusive
+        flock serializes concurrent runs touching the same cache entry.
+        """
+        self._cache_root.mkdir(parents=True, exist_ok=True)
+        cache_dir = self._cache_root / hashlib.sha1(repo_url.encode()).hexdigest()
+
+        with open(cache_dir.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if cache_dir.exists():
+                cached = Repo(cache_dir)
+                cached.git.update_environment(**self._git_env)
+                cached.git.fetch("--depth=1", "origin", "HEAD")
+                cached.git.reset("--hard", "FETCH_HEAD")
+                logger.debug("Reusing cached clone for %s", repo_url)
+            else:
+                self._shallow_clone(repo_url, cache_dir)
+                cached = Repo(cache_dir)
+                cached.git.update_environment(**self._git_env)
+
+            # Keep the LRU stamp and drop worktree records left by runs
+            # whose sandbox directories were already cleaned up.
+            os.utime(cache_dir)
+            cached.git.worktree("prune")
+            cached.git.worktree("add", "--detach", "--force", str(run_path), cached.head.commit.hexsha)
+            self._evict_stale_cache_entries()
+
+    def _evict_stale_cache_entries(self) -> None:
+        entries = sorted(
+            (entry for entry in self._cache_root.iterdir() if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for stale in entries[: max(0, len(entries) - _CACHE_MAX_ENTRIES)]:
+            # Only evict an entry we can lock without waiting: contention
+            # means another run is fetching or adding a worktree on it.
+            lock_path = stale.with_suffix(".lock")
+            try:
+                with open(lock_path, "w") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        logger.debug("Cache entry %s is in use; skipping eviction", stale.name)
+                        continue
+                    # An entry still backing a run's worktree must stay:
+                    # the run's .git file points into this clone, and
+                    # removing it would break commit/push mid-run.
+                    if self._has_live_worktrees(stale):
+                        logger.debug("Cache entry %s backs live worktrees; skipping eviction", stale.name)
+                        continue
+                    logger.debug("Evicting cached clone %s", stale.name)
+                    rmtree(stale, ignore_errors=True)
+                    lock_path.unlink(missing_ok=True)
+            except OSError as exc:
+                logger.debug("Could not evict cache entry %s: %s", stale.name, exc)
+
+    def cleanup_run(self, run_id: str) -> None:
+        """Remove a finished run's checkout from the sandbox.
+
+        Without this, every cache entry keeps a registered worktree per
+        run forever, _has_live_worktrees always answers True, and the
+        cache eviction bound never fires. The next worktree prune on the
+        backing entry drops the stale record.
+        """
+        if _KEEP_RUN_WORKSPACES:
+            return
+        run_path = self._sandbox_root / run_id
+        if run_path.exists():
+            logger.debug("Removing run workspace %s", run_path)
+            rmtree(run_path, ignore_errors=True)
+
+    def _has_live_worktrees(self, cache_dir: Path) -> bool:
+        """True when runs still have worktrees checked out of this clone."""
+        try:
+            cached = Repo(cache_dir)
+            # Drop records for sandbox dirs that were already deleted so
+            # only genuinely live worktrees count.
+            cached.git.worktree("prune")
+            listing = cached.git.worktree("list", "--porcelain")
+        except Exception:
+            # If the entry can't be inspected, keep it - eviction is an
+            # optimization and must never risk a live run.
+            return True
+        # The first "worktree" block is the cached clone itself.
+        return sum(1 for line in listing.splitlines() if line.startswith("worktree ")) > 1
 
     def _detect_language(self, repo_path: Path) -> str:
-        if any(repo_path.rglob("pyproject.toml")) or any(repo_path.rglob("requirements.txt")):
-            return "python"
-        if any(repo_path.rglob("package.json")):
-            return "javascript"
+        # Markers usually sit at the repo root - one scandir resolves the
+        # common case before paying for a recursive walk.
+        with os.scandir(repo_path) as entries:
+            for entry in entries:
+                if entry.name in _LANGUAGE_MARKERS and entry.is_file():
+                    return _LANGUAGE_MARKERS[entry.name]
+
+        # Single walk with pruning instead of one rglob per marker file.
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+            for name in files:
+                if name in _LANGUAGE_MARKERS:
+                    return _LANGUAGE_MARKERS[name]
         return "unknown"
@@ -1,25 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import NamedTuple
 
 
-@dataclass
-class ScoreBreakdown:
+class ScoreBreakdown(NamedTuple):
     base_score: int
     time_bonus: int
     commit_penalty: int
     final_score: int
 
 
-class ScoreAgent:
-    def calculate_score(self, execution_time_seconds: int, commits: int) -> ScoreBreakdown:
-        base_score = 100
-        time_bonus = 10 if execution_time_seconds < 300 else 0
-        commit_penalty = (commits - 20) * 2 if commits > 20 else 0
-        final_score = max(base_score + time_bonus - commit_penalty, 0)
-        return ScoreBreakdown(
-            base_score=base_score,
-            time_bonus=time_bonus,
-            commit_penalty=commit_penalty,
-            final_score=final_score,
-        )
+@lru_cache(maxsize=1024)
+def calculate_score(execution_time_seconds: int, commits: int) -> ScoreBreakdown:
+    """Pure scoring arithmetic; cached since identical inputs recur across
+    repeated runs and test suites."""
+    base_score = 100
+    time_bonus = 10 if execution_time_seconds < 300 else 0
+    commit_penalty = (commits - 20) * 2 if commits > 20 else 0
+    final_score = max(base_score + time_bonus - commit_penalty, 0)
+    return ScoreBreakdown(
+        base_score=base_score,
+        time_bonus=time_bonus,
+        commit_penalty=commit_penalty,
+        final_score=final_score,
+    )
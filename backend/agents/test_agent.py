@@ -1,26 +1,110 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+import functools
 import logging
+import os
 from pathlib import Path
 import re
+import shutil
+import subprocess
 from typing import List
 
 from sandbox.executor import SandboxExecutor
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import - parsing runs them against every pytest log.
+# Byte patterns: the executor hands back raw bytes and only matched
+# slices are ever decoded, so a big log never pays a full UTF-8 pass.
+# Pattern 1: Python traceback format - File "path", line 123
+_TRACEBACK_RE = re.compile(rb'File "([^"]+)", line (\d+)')
+# Patterns 2+3 fused into one alternation so the engine scans the buffer
+# once: pytest short-format frames (path.py:123: in function_name) and
+# error lines (E   ErrorType: message), dispatched on which group hit.
+_COMBINED_RE = re.compile(
+    rb'^(?:(?P<loc_file>[\w./\\-]+\.py):(?P<loc_line>\d+):\s+in\s+\w+'
+    rb'|E\s+(?P<err_type>\w+(?:Error|Exception|Failure)):\s*(?P<err_msg>.+)$)',
+    re.MULTILINE,
+)
+# Pattern 4: Error type - ErrorType: message (general)
+_ERR_TYPE_RE = re.compile(rb'^(\w*(?:Error|Exception|Failure)):\s*(.+)', re.MULTILINE)
+# Setup-error (exit code 4) patterns: location and E-line.
+_SETUP_LOC_RE = re.compile(r'([\w./]+\.py):(\d+):')
+_SETUP_ERR_RE = re.compile(r'E\s+(\w+(?:Error|Exception)?)\s*:\s*(.+)')
 
-@dataclass
+# Directories never descended into during test discovery.
+_DISCOVERY_SKIP_DIRS = frozenset({'.venv', 'venv', '__pycache__', '.git', 'node_modules'})
+
+# Log at most this much of each pytest stream; the interesting part
+# (FAILURES section and summary) is at the tail anyway.
+_LOG_DUMP_TAIL_CHARS = 8192
+
+
+@functools.lru_cache(maxsize=2048)
+def _normalize_file_path_impl(file_path: str, repo_path: str) -> str:
+    """Normalize a path from pytest output to be relative to the repo root.
+
+    Module-level so lru_cache can key on the two strings directly; a
+    failure set typically mentions the same handful of files dozens of
+    times, so hits dominate.
+    """
+    normalized = file_path
+    # Remove absolute path prefixes
+    repo_prefix = repo_path.rstrip('/') + '/'
+    if normalized.startswith(repo_prefix):
+        normalized = normalized[len(repo_prefix):]
+
+    # Remove leading /workspace (from Docker)
+    if normalized.startswith('/workspace/'):
+        normalized = normalized[len('/workspace/'):]
+
+    # Remove leading ./
+    if normalized.startswith('./'):
+        normalized = normalized[2:]
+
+    return normalized
+
+
+# Slotted by hand rather than via dataclass so the traceback can stay a
+# raw bytes slice: most consumers only read file/line/error_type, and
+# decoding kilobytes of traceback per failure is wasted unless someone
+# actually asks for it.
 class TestFailure:
-    file: str
-    line_number: int
-    message: str
-    error_type: str = "UnknownError"
-    full_traceback: str = ""
+    __slots__ = ('file', 'line_number', 'message', 'error_type', '_tb_raw', '_tb_cache')
+
+    def __init__(
+        self,
+        file: str,
+        line_number: int,
+        message: str,
+        error_type: str = "UnknownError",
+        full_traceback: bytes | str = "",
+    ) -> None:
+        self.file = file
+        self.line_number = line_number
+        self.message = message
+        self.error_type = error_type
+        self._tb_raw = full_traceback
+        self._tb_cache: str | None = None
+
+    @property
+    def full_traceback(self) -> str:
+        cached = self._tb_cache
+        if cached is None:
+            raw = self._tb_raw
+            cached = raw.decode('utf-8', 'replace') if isinstance(raw, bytes) else raw
+            self._tb_cache = cached
+        return cached
 
+    def __repr__(self) -> str:
+        return (
+            f"TestFailure(file={self.file!r}, line_number={self.line_number!r}, "
+            f"message={self.message!r}, error_type={self.error_type!r})"
+        )
 
-@dataclass
+
+@dataclass(slots=True)
 class TestRunResult:
     passed: bool
     failures: List[TestFailure] = field(default_factory=list)
@@ -29,117 +113,117 @@ class TestRunResult:
 class TestAgent:
     def __init__(self) -> None:
         self.sandbox_executor = SandboxExecutor()
+        # Entries from a previous repo_path are dead weight in a
+        # long-running worker; start each agent with a clean cache.
+        _normalize_file_path_impl.cache_clear()
 
     def run_tests(self, repo_path: str) -> TestRunResult:
-        logger.info(f"🔍 DEBUG: ===== TEST_AGENT.RUN_TESTS() CALLED =====")
-        logger.info(f"🔍 DEBUG: repo_path parameter = {repo_path}")
-        
-        # Debug: Current working directory
-        import os
-        import shutil
-        cwd = os.getcwd()
-        logger.info(f"🔍 DEBUG: os.getcwd() = {cwd}")
-        logger.info(f"🔍 DEBUG: os.path.abspath(repo_path) = {os.path.abspath(repo_path)}")
-        logger.info(f"🔍 DEBUG: os.path.exists(repo_path) = {os.path.exists(repo_path)}")
-        
-        # Debug: List files in repo_path
-        if os.path.exists(repo_path):
-            try:
-                files = os.listdir(repo_path)
-                logger.info(f"🔍 DEBUG: Files in repo_path: {files}")
-                
-                # Check for requirements.txt
-                req_path = os.path.join(repo_path, "requirements.txt")
-                logger.info(f"🔍 DEBUG: requirements.txt exists: {os.path.exists(req_path)}")
-                
-                # Check for test files
-                test_files_found = []
-                for root, dirs, files_in_dir in os.walk(repo_path):
-                    for f in files_in_dir:
-                        if f.startswith('test_') or f.endswith('_test.py'):
-                            test_files_found.append(os.path.join(root, f))
-                logger.info(f"🔍 DEBUG: Test files found: {test_files_found}")
-            except Exception as e:
-                logger.error(f"🔍 DEBUG: Error listing repo_path: {e}")
-        else:
-            logger.error(f"🔍 DEBUG: repo_path does NOT exist!")
-        
-        # Debug: Check if pytest is available
-        pytest_path = shutil.which('pytest')
-        logger.info(f"🔍 DEBUG: pytest executable location: {pytest_path}")
-        
-        # Check if python3.11 has pytest module
-        try:
-            import subprocess
-            result = subprocess.run(
-                ['python3.11', '-m', 'pytest', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            logger.info(f"🔍 DEBUG: pytest --version output: {result.stdout}")
-            logger.info(f"🔍 DEBUG: pytest --version stderr: {result.stderr}")
-            logger.info(f"🔍 DEBUG: pytest --version returncode: {result.returncode}")
-        except Exception as e:
-            logger.error(f"🔍 DEBUG: Error checking pytest: {e}")
-        
+        # Environment diagnostics (directory listings, tree walk, pytest
+        # version probe via a forked interpreter) are debug-only: at INFO
+        # they would cost real syscalls and a subprocess on every run.
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_environment_debug(repo_path)
+
         root = Path(repo_path)
         test_files = self._discover_test_files(root)
-        logger.info(f"🔍 DEBUG: _discover_test_files() returned {len(test_files)} files")
-        logger.info(f"🔍 DEBUG: Test files: {test_files}")
-        
+        # Discovery already walked the tree; its result doubles as the
+        # debug file listing instead of a second os.walk.
+        logger.debug("Discovered %d test file(s) in %s: %s", len(test_files), repo_path, test_files)
+
         if not test_files:
-            logger.error(f"No test files discovered in {repo_path}")
+            logger.error("No test files discovered in %s", repo_path)
             raise ValueError(f"No test files found in repository {repo_path}")
 
-        logger.info(f"🔍 DEBUG: About to call sandbox_executor.run_pytest()")
-        logger.info(f"🔍 DEBUG: Passing repo_path: {str(root)}")
-        
         completed = self.sandbox_executor.run_pytest(str(root))
-        
-        logger.info(f"🔍 DEBUG: ===== PYTEST EXECUTION COMPLETE =====")
-        logger.info(f"🔍 DEBUG: Exit code: {completed.returncode}")
-        logger.info(f"🔍 DEBUG: STDOUT length: {len(completed.stdout)} chars")
-        logger.info(f"🔍 DEBUG: STDERR length: {len(completed.stderr)} chars")
-        logger.info(f"🔍 DEBUG: ----- FULL STDOUT -----")
-        logger.info(completed.stdout)
-        logger.info(f"🔍 DEBUG: ----- FULL STDERR -----")
-        logger.info(completed.stderr)
-        logger.info(f"🔍 DEBUG: ----- END OUTPUT -----")
-        
-        combined_output = f"{completed.stdout}\n{completed.stderr}"
-        logger.debug(f"Pytest output:\n{combined_output}")
-        
+        logger.debug(
+            "pytest finished: returncode=%d stdout=%d chars stderr=%d chars",
+            completed.returncode, len(completed.stdout), len(completed.stderr),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Pytest stdout (tail):\n%s", completed.stdout[-_LOG_DUMP_TAIL_CHARS:].decode('utf-8', 'replace'))
+            logger.debug("Pytest stderr (tail):\n%s", completed.stderr[-_LOG_DUMP_TAIL_CHARS:].decode('utf-8', 'replace'))
+
         if completed.returncode == 0:
-            logger.info(f"🔍 DEBUG: Tests PASSED (returncode=0)")
             return TestRunResult(passed=True, failures=[])
 
-        logger.info(f"🔍 DEBUG: Tests FAILED (returncode={completed.returncode})")
-        logger.info(f"🔍 DEBUG: About to parse pytest output")
-        
-        # Handle pytest exit code 4: internal error/configuration error
+        # Each stream is parsed on its own - concatenating them just to
+        # run one regex pass would allocate a third buffer as large as
+        # both streams combined.
+
+        # Handle pytest exit code 4: internal error/configuration error.
+        # Rare path, so decoding the streams for the line-based setup
+        # parser is fine here.
         if completed.returncode == 4:
-            logger.info(f"🔍 DEBUG: Exit code 4 detected - pytest configuration/setup error")
-            setup_failure = self._parse_setup_error(combined_output, repo_path)
+            setup_failure = self._parse_setup_error(
+                completed.stdout.decode('utf-8', 'replace'), repo_path
+            ) or self._parse_setup_error(completed.stderr.decode('utf-8', 'replace'), repo_path)
             if setup_failure:
-                logger.info(f"🔍 DEBUG: Parsed setup error: {setup_failure.error_type}")
+                logger.debug("Parsed setup error: %s", setup_failure.error_type)
                 return TestRunResult(passed=False, failures=[setup_failure])
-        
-        failures = self._parse_pytest_output(combined_output, repo_path)
-        logger.info(f"🔍 DEBUG: Parsed {len(failures)} failure(s)")
-        
+
+        failures = self._parse_pytest_output(completed.stdout, repo_path)
+        seen = {(failure.file, failure.line_number) for failure in failures}
+        for failure in self._parse_pytest_output(completed.stderr, repo_path):
+            if (failure.file, failure.line_number) not in seen:
+                failures.append(failure)
+
         if not failures:
-            logger.error(f"Tests failed but no failures parsed from output:\n{combined_output}")
+            logger.error(
+                "Tests failed but no failures parsed from output.\nstdout (tail):\n%s\nstderr (tail):\n%s",
+                completed.stdout[-_LOG_DUMP_TAIL_CHARS:].decode('utf-8', 'replace'),
+                completed.stderr[-_LOG_DUMP_TAIL_CHARS:].decode('utf-8', 'replace'),
+            )
             raise ValueError("Tests failed but no structured failures could be extracted from pytest output")
-        
-        logger.info(f"Parsed {len(failures)} failure(s)")
+
+        logger.info("Parsed %d failure(s)", len(failures))
         return TestRunResult(passed=False, failures=failures)
 
+    def _log_environment_debug(self, repo_path: str) -> None:
+        """Dump the sandbox environment; only called at DEBUG level."""
+        logger.debug("run_tests called with repo_path=%s (cwd=%s)", repo_path, os.getcwd())
+        logger.debug("repo_path exists: %s", os.path.exists(repo_path))
+
+        if os.path.exists(repo_path):
+            req_path = os.path.join(repo_path, "requirements.txt")
+            logger.debug("requirements.txt exists: %s", os.path.exists(req_path))
+
+        logger.debug("pytest executable location: %s", shutil.which('pytest'))
+        try:
+            result = subprocess.run(
+                ['python3.11', '-m', 'pytest', '--version'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            logger.debug(
+                "pytest --version: rc=%d stdout=%s stderr=%s",
+                result.returncode, result.stdout.strip(), result.stderr.strip(),
+            )
+        except Exception as e:
+            logger.debug("Error checking pytest: %s", e)
+
     def _discover_test_files(self, root: Path) -> List[Path]:
-        candidates = list(root.rglob("test_*.py")) + list(root.rglob("*_test.py"))
-        return [path for path in candidates if ".venv" not in path.parts and "venv" not in path.parts]
+        # Single scandir walk instead of two rglob passes: dependency and
+        # VCS trees are pruned before descending (a .venv alone can hold
+        # thousands of files the rglob version traversed and then threw
+        # away), and DirEntry.is_dir reuses the stat from the listing.
+        def _walk(path):
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if name in _DISCOVERY_SKIP_DIRS:
+                                continue
+                            yield from _walk(entry.path)
+                        elif name.endswith('.py') and (name.startswith('test_') or name.endswith('_test.py')):
+                            yield Path(entry.path)
+            except PermissionError:
+                pass
 
-    def _parse_pytest_output(self, output: str, repo_path: str) -> List[TestFailure]:
+        return list(_walk(root))
+
+    def _parse_pytest_output(self, output: bytes, repo_path: str) -> List[TestFailure]:
         """Parse pytest output including full Python tracebacks.
         
         Supports multiple formats:
@@ -148,110 +232,84 @@ class TestAgent:
         3. Pytest error format: E   ErrorType: message
         4. Error type extraction: NameError: name 'x' is not defined
         """
+        # C-level substring prescan: without an E-line or a traceback
+        # frame neither pass can produce a failure, so skip the MULTILINE
+        # regex scans entirely (collection errors, signals, empty logs).
+        if b'E   ' not in output and b'File "' not in output:
+            return []
+
         failures: List[TestFailure] = []
         seen: set[tuple[str, int]] = set()
-        
-        # Pattern 1: Python traceback format - File "path", line 123
-        traceback_pattern = re.compile(r'File "([^"]+)", line (\d+)')
-        
-        # Pattern 2: Pytest short format - path.py:123: in function_name
-        pytest_location_pattern = re.compile(r'^([\w./\\-]+\.py):(\d+):\s+in\s+\w+', re.MULTILINE)
-        
-        # Pattern 3: Pytest error line - E   ErrorType: message
-        pytest_error_pattern = re.compile(r'^E\s+(\w+(?:Error|Exception|Failure)):\s*(.+)$', re.MULTILINE)
-        
-        # Pattern 4: Error type - ErrorType: message (general)
-        error_type_pattern = re.compile(r'^(\w*(?:Error|Exception|Failure)):\s*(.+)', re.MULTILINE)
-        
-        lines = output.split('\n')
-        
-        # Parse pytest verbose output with FAILURES section
-        i = 0
-        current_file = None
-        current_line = None
-        current_error_type = "UnknownError"
-        current_message = ""
-        current_traceback = []
-        
-        while i < len(lines):
-            line = lines[i]
-            
-            # Look for file:line: in function_name pattern
-            location_match = pytest_location_pattern.search(line)
-            if location_match:
-                current_file = location_match.group(1)
-                current_line = int(location_match.group(2))
-                current_file = self._normalize_file_path(current_file, repo_path)
-                current_traceback = [line]
-                logger.debug(f"Found failure location: {current_file}:{current_line}")
-            
-            # Look for E   ErrorType: message pattern (pytest error line)
-            error_match = pytest_error_pattern.search(line)
-            if error_match and current_file and current_line:
-                current_error_type = error_match.group(1)
-                current_message = error_match.group(2).strip()
-                current_traceback.append(line)
-                
-                # We have complete failure info - save it
-                key = (current_file, current_line)
-                if key not in seen:
-                    seen.add(key)
-                    logger.debug(f"Parsed failure: {current_file}:{current_line} - {current_error_type}: {current_message}")
-                    failures.append(
-                        TestFailure(
-                            file=current_file,
-                            line_number=current_line,
-                            message=current_message,
-                            error_type=current_error_type,
-                            full_traceback='\n'.join(current_traceback)
-                        )
-                    )
-                
-                # Reset for next failure
-                current_file = None
-                current_line = None
-                current_error_type = "UnknownError"
-                current_message = ""
-                current_traceback = []
-            elif current_traceback:
-                # Accumulate traceback lines
-                current_traceback.append(line)
-            
-            # Also handle Python traceback format (fallback)
-            traceback_match = traceback_pattern.search(line)
-            if traceback_match:
-                file_path = traceback_match.group(1)
-                line_number = int(traceback_match.group(2))
-                file_path = self._normalize_file_path(file_path, repo_path)
-                
-                # Look ahead for error type
-                error_type = "UnknownError"
-                message = "Test failure"
-                full_traceback = line
-                
-                for j in range(i + 1, min(i + 5, len(lines))):
-                    full_traceback += "\n" + lines[j]
-                    error_match = error_type_pattern.search(lines[j])
-                    if error_match:
-                        error_type = error_match.group(1)
-                        message = error_match.group(2).strip()
-                        break
-                
-                key = (file_path, line_number)
-                if key not in seen and file_path.endswith('.py'):
-                    seen.add(key)
-                    logger.debug(f"Parsed Python traceback: {file_path}:{line_number} - {error_type}: {message}")
-                    failures.append(
-                        TestFailure(
-                            file=file_path,
-                            line_number=line_number,
-                            message=message,
-                            error_type=error_type,
-                            full_traceback=full_traceback.strip()
-                        )
+
+        # One finditer pass over the buffer; each E-line pairs with the
+        # most recent location frame before it, as in the old line walk.
+        last_location = None
+        for match in _COMBINED_RE.finditer(output):
+            if match.group('loc_file') is not None:
+                last_location = match
+                continue
+            if last_location is None:
+                continue
+
+            file_path = self._normalize_file_path(last_location.group('loc_file').decode('utf-8', 'replace'), repo_path)
+            line_number = int(last_location.group('loc_line'))
+            key = (file_path, line_number)
+            if key not in seen:
+                seen.add(key)
+                error_type = match.group('err_type').decode('utf-8', 'replace')
+                message = match.group('err_msg').decode('utf-8', 'replace').strip()
+                logger.debug("Parsed failure: %s:%s - %s: %s", file_path, line_number, error_type, message)
+                failures.append(
+                    TestFailure(
+                        file=file_path,
+                        line_number=line_number,
+                        message=message,
+                        error_type=error_type,
+                        # Everything between the frame and its E-line,
+                        # kept as bytes; decoded only if read.
+                        full_traceback=output[last_location.start():match.end()],
                     )
-            
-            i += 1
+                )
+            last_location = None
+
+        # Fallback: plain Python traceback frames, with a bounded lookahead
+        # (the frame line plus four more) for the error type.
+        for match in _TRACEBACK_RE.finditer(output):
+            file_path = self._normalize_file_path(match.group(1).decode('utf-8', 'replace'), repo_path)
+            line_number = int(match.group(2))
+            key = (file_path, line_number)
+            if key in seen or not file_path.endswith('.py'):
+                continue
+
+            window_start = output.rfind(b'\n', 0, match.start()) + 1
+            window_end = match.end()
+            for _ in range(5):
+                newline = output.find(b'\n', window_end)
+                if newline == -1:
+                    window_end = len(output)
+                    break
+                window_end = newline + 1
+            window = output[window_start:window_end]
+
+            error_type = "UnknownError"
+            message = "Test failure"
+            error_match = _ERR_TYPE_RE.search(window, match.end() - window_start)
+            if error_match:
+                error_type = error_match.group(1).decode('utf-8', 'replace')
+                message = error_match.group(2).decode('utf-8', 'replace').strip()
+                window = window[:error_match.end()]
+
+            seen.add(key)
+            logger.debug("Parsed Python traceback: %s:%s - %s: %s", file_path, line_number, error_type, message)
+            failures.append(
+                TestFailure(
+                    file=file_path,
+                    line_number=line_number,
+                    message=message,
+                    error_type=error_type,
+                    full_traceback=window.strip(),
+                )
+            )
 
         return failures
     
@@ -262,8 +320,13 @@ class TestAgent:
         - ImportError while loading conftest
         - ModuleNotFoundError for missing dependencies
         """
+        # A setup failure is only ever reported with a file location, so
+        # outputs without a .py: token can be rejected before the line walk.
+        if '.py:' not in output:
+            return None
+
         lines = output.split('\n')
-        
+
         # Look for patterns like:
         # "ImportError while loading conftest '/workspace/tests/conftest.py'"
         # "tests/conftest.py:4: in <module>"
@@ -273,12 +336,13 @@ class TestAgent:
         error_line = 1
         error_type = "ImportError"
         error_message = "Setup/configuration error"
-        full_traceback = ""
+        # Accumulate in a list - += on a growing string is O(n^2).
+        tb_parts: list[str] = []
         
         for i, line in enumerate(lines):
             # Extract file path and line number from patterns like:
             # "tests/conftest.py:4: in <module>"
-            match = re.search(r'([\w./]+\.py):(\d+):', line)
+            match = _SETUP_LOC_RE.search(line)
             if match and not error_file:
                 error_file = self._normalize_file_path(match.group(1), repo_path)
                 error_line = int(match.group(2))
@@ -286,39 +350,27 @@ class TestAgent:
             # Extract error type and message from patterns like:
             # "E   ModuleNotFoundError: No module named 'pytest_httpbin'"
             if line.strip().startswith('E   '):
-                error_match = re.search(r'E\s+(\w+(?:Error|Exception)?)\s*:\s*(.+)', line)
+                error_match = _SETUP_ERR_RE.search(line)
                 if error_match:
                     error_type = error_match.group(1)
                     error_message = error_match.group(2).strip()
             
             # Build full traceback
             if error_file or line.strip().startswith('E   '):
-                full_traceback += line + "\n"
-        
+                tb_parts.append(line)
+
         if error_file:
-            logger.info(f"🔍 DEBUG: Parsed setup error - {error_file}:{error_line} - {error_type}: {error_message}")
+            logger.debug("Parsed setup error - %s:%s - %s: %s", error_file, error_line, error_type, error_message)
             return TestFailure(
                 file=error_file,
                 line_number=error_line,
                 message=error_message,
                 error_type=error_type,
-                full_traceback=full_traceback.strip()
+                full_traceback="\n".join(tb_parts).strip()
             )
         
         return None
     
     def _normalize_file_path(self, file_path: str, repo_path: str) -> str:
         """Normalize file path to be relative to repo root."""
-        # Remove absolute path prefixes
-        if file_path.startswith(repo_path):
-            file_path = file_path[len(repo_path):].lstrip('/')
-        
-        # Remove leading /workspace (from Docker)
-        if file_path.startswith('/workspace/'):
-            file_path = file_path[len('/workspace/'):]
-        
-        # Remove leading ./ 
-        if file_path.startswith('./'):
-            file_path = file_path[2:]
-        
-        return file_path
+        return _normalize_file_path_impl(file_path, repo_path)
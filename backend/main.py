@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import logging
 import os
-import re
+import string
 
 from dotenv import load_dotenv
 from fastapi import BackgroundTasks
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+import orjson
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from agents import OrchestratorAgent
 from models import RunAgentRequest, RunAgentResponse, RunStatus
@@ -21,9 +23,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Autonomous CI/CD Healing Agent API", version="0.1.0")
+app = FastAPI(
+    title="Autonomous CI/CD Healing Agent API",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+)
 
 RETRY_LIMIT = int(os.getenv("RETRY_LIMIT", "5"))
+# When a broker is configured, runs execute on Celery workers instead of
+# in-process, so deploys/crashes of the API process don't lose runs.
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "")
+# Celery mode only works with state that crosses process boundaries:
+# without REDIS_URL each process gets its own InMemoryRunStore (the
+# worker's get() returns None and the run stays RUNNING forever), and
+# webhook waiters live in the worker while the webhook route resolves
+# them in the API process. Refuse to start rather than fail silently.
+if CELERY_BROKER_URL:
+    if not os.getenv("REDIS_URL"):
+        raise RuntimeError("CELERY_BROKER_URL requires REDIS_URL so run state is shared between the API and workers")
+    if os.getenv("GITHUB_WEBHOOK_SECRET"):
+        raise RuntimeError(
+            "GITHUB_WEBHOOK_SECRET cannot be combined with CELERY_BROKER_URL: "
+            "webhook events arrive in the API process but runs wait in the worker; unset one of them"
+        )
 CORS_ORIGINS = os.getenv("CORS_ALLOW_ORIGINS", "*")
 CORS_ORIGIN_LIST = [origin.strip() for origin in CORS_ORIGINS.split(",") if origin.strip()]
 orchestrator: OrchestratorAgent | None = None
@@ -38,9 +60,15 @@ app.add_middleware(
 )
 
 
+# Deletion table of every allowed character; translate strips them at C
+# speed, so a valid name maps to the empty string - no regex engine on
+# the request path.
+_VALID_NAME_TABLE = str.maketrans("", "", string.ascii_letters + string.digits + string.whitespace)
+
+
 def _is_valid_name(value: str) -> bool:
-    """Validate name for branch format - only alphanumeric and spaces."""
-    return bool(re.match(r"^[a-zA-Z0-9\s]+$", value))
+    """Validate name for branch format - only alphanumeric and whitespace."""
+    return bool(value) and not value.translate(_VALID_NAME_TABLE)
 
 
 def _get_orchestrator() -> OrchestratorAgent:
@@ -58,17 +86,20 @@ def _get_orchestrator() -> OrchestratorAgent:
         raise HTTPException(status_code=503, detail=f"Backend not ready: {orchestrator_init_error}") from exc
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    if orchestrator is not None:
+        await orchestrator.aclose()
+
+
 @app.get("/health")
-def health() -> dict[str, str]:
+async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
 @app.post("/run-agent", response_model=RunAgentResponse)
 def run_agent(payload: RunAgentRequest, background_tasks: BackgroundTasks) -> RunAgentResponse:
-    # Validate input
-    if not payload.repo_url or not payload.team_name or not payload.leader_name:
-        raise HTTPException(status_code=400, detail="Missing required fields: repo_url, team_name, leader_name")
-    
+    # Presence and repo_url scheme are enforced by RunAgentRequest itself.
     # Validate team_name and leader_name format
     if not _is_valid_name(payload.team_name):
         raise HTTPException(status_code=400, detail="team_name contains invalid characters")
@@ -82,13 +113,23 @@ def run_agent(payload: RunAgentRequest, background_tasks: BackgroundTasks) -> Ru
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    background_tasks.add_task(instance.execute_run, run_state.run_id, payload)
+    if CELERY_BROKER_URL:
+        from tasks import run_pipeline
+
+        run_pipeline.delay(run_state.run_id, payload.model_dump_json())
+    else:
+        # Async task runs on the server's event loop - no worker thread is
+        # held for the lifetime of the run.
+        background_tasks.add_task(instance.execute_run_async, run_state.run_id, payload)
 
     return RunAgentResponse(run_id=run_state.run_id, status=RunStatus.RUNNING)
 
 
+# async: touches only in-memory state, so running on the event loop
+# avoids the threadpool dispatch sync endpoints pay. run_agent stays
+# sync because start_run can do blocking git work.
 @app.get("/run-status/{run_id}")
-def run_status(run_id: str) -> dict:
+async def run_status(run_id: str) -> dict:
     instance = _get_orchestrator()
     run_state = instance.get_run(run_id)
     if run_state is None:
@@ -97,14 +138,46 @@ def run_status(run_id: str) -> dict:
     return {
         "run_id": run_state.run_id,
         "status": run_state.status,
-        "results": run_state.results.model_dump(),
+        # Cached dump: the results tree is only re-serialized after a
+        # store write, not on every poll.
+        "results": run_state.results_dump(),
         "score_breakdown": {
             "base": run_state.results.score_base,
             "time_bonus": run_state.results.score_time_bonus,
             "commit_penalty": run_state.results.score_commit_penalty,
             "final": run_state.results.score,
         },
-        "started_at": run_state.started_at.isoformat(),
+        "started_at": run_state.started_at_iso(),
         "finished_at": run_state.finished_at.isoformat() if run_state.finished_at else None,
     }
 
+
+@app.post("/webhooks/github/workflow_run")
+async def github_workflow_run_webhook(request: Request) -> dict[str, str]:
+    """Receive workflow_run completion pushes so CIAgent can skip polling."""
+    instance = _get_orchestrator()
+    body = await request.body()
+    signature = request.headers.get("X-Hub-Signature-256")
+    if not instance.ci_agent.verify_webhook_signature(body, signature):
+        raise HTTPException(status_code=403, detail="Invalid webhook signature")
+
+    payload = orjson.loads(body)
+    if payload.get("action") != "completed":
+        return {"status": "ignored"}
+
+    workflow_run = payload.get("workflow_run") or {}
+    repository = payload.get("repository") or {}
+    owner = (repository.get("owner") or {}).get("login", "")
+    repo = repository.get("name", "")
+    branch = workflow_run.get("head_branch", "")
+    if not (owner and repo and branch):
+        raise HTTPException(status_code=400, detail="Malformed workflow_run payload")
+
+    delivered = instance.ci_agent.notify_workflow_completed(
+        owner=owner,
+        repo=repo,
+        branch_name=branch,
+        conclusion=workflow_run.get("conclusion"),
+    )
+    return {"status": "delivered" if delivered else "no-waiter"}
+
@@ -4,7 +4,11 @@ from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+
+# Cheap prefix whitelist instead of HttpUrl: a full URL parse per request
+# is overkill, and file:// / git@ remotes must stay accepted for testing.
+_ALLOWED_URL_PREFIXES = ("http://", "https://", "file://", "git@", "ssh://")
 
 
 class RunStatus(str, Enum):
@@ -62,11 +66,22 @@ class ResultsSchema(BaseModel):
     ci_timeline: List[CITimelineRecord] = Field(default_factory=list)
 
 
+# Field list snapshot for the fast serialization path below.
+_RESULTS_FIELDS = tuple(ResultsSchema.model_fields)
+
+
 class RunAgentRequest(BaseModel):
-    repo_url: str  # Changed from HttpUrl to support file:// URLs for testing
+    repo_url: str = Field(min_length=1)
     team_name: str = Field(min_length=1)
     leader_name: str = Field(min_length=1)
 
+    @field_validator("repo_url")
+    @classmethod
+    def _check_prefix(cls, v: str) -> str:
+        if not v.startswith(_ALLOWED_URL_PREFIXES):
+            raise ValueError("unsupported repo_url scheme")
+        return v
+
 
 class RunAgentResponse(BaseModel):
     run_id: str
@@ -79,3 +94,30 @@ class RunState(BaseModel):
     started_at: datetime
     finished_at: Optional[datetime] = None
     results: ResultsSchema
+
+    # Serialization caches for the status-poll endpoint: model_dump walks
+    # the whole results tree and isoformat allocates a fresh string, so
+    # both are computed once and reused until the store invalidates on
+    # write (started_at never changes after creation).
+    _results_cache: Optional[dict] = PrivateAttr(default=None)
+    _started_at_iso: Optional[str] = PrivateAttr(default=None)
+
+    def results_dump(self) -> dict:
+        if self._results_cache is None:
+            # Direct attribute reads instead of a full model_dump: the
+            # scalar fields are already validated plain values, so only
+            # the nested record lists need the recursive dump.
+            results = self.results
+            dump = {name: getattr(results, name) for name in _RESULTS_FIELDS}
+            dump["fixes"] = [fix.model_dump() for fix in results.fixes]
+            dump["ci_timeline"] = [record.model_dump() for record in results.ci_timeline]
+            self._results_cache = dump
+        return self._results_cache
+
+    def invalidate_results_cache(self) -> None:
+        self._results_cache = None
+
+    def started_at_iso(self) -> str:
+        if self._started_at_iso is None:
+            self._started_at_iso = self.started_at.isoformat()
+        return self._started_at_iso
@@ -1,23 +1,78 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+import os
 from threading import Lock
 from typing import Dict
 
 from models import RunState
 
+# Completed runs retained before the oldest are evicted; a busy gateway
+# would otherwise grow without bound until restart.
+_MAX_RUN_HISTORY = int(os.getenv("MAX_RUN_HISTORY", "10000"))
+
 
 class InMemoryRunStore:
-    def __init__(self) -> None:
-        self._runs: Dict[str, RunState] = {}
+    def __init__(self, max_runs: int = _MAX_RUN_HISTORY) -> None:
+        self._runs: OrderedDict[str, RunState] = OrderedDict()
+        self._max_runs = max_runs
+        # Guards writes only. Reads go straight to dict.get: a single
+        # dict lookup is atomic under the GIL, so status polls skip the
+        # mutex round-trip. Reads deliberately don't bump recency -
+        # every state change upserts, so active runs are always recent
+        # and eviction only ever reaches long-finished ones.
         self._lock = Lock()
 
-    def upsert(self, run_state: RunState) -> None:
+    def upsert(self, run_state: RunState, flush: bool = True) -> None:
+        # A dict write is already the cheapest possible flush, so the
+        # batching hint only matters for stores with real write costs.
+        run_state.invalidate_results_cache()
         with self._lock:
             self._runs[run_state.run_id] = run_state
+            self._runs.move_to_end(run_state.run_id)
+            while len(self._runs) > self._max_runs:
+                self._runs.popitem(last=False)
+
+    def get(self, run_id: str) -> RunState | None:
+        return self._runs.get(run_id)
+
+
+class RedisRunStore:
+    """Run state persisted in Redis so it survives worker restarts and is
+    shared between the API process and Celery workers."""
+
+    def __init__(self, url: str) -> None:
+        import redis  # optional dependency; only needed when REDIS_URL is set
+
+        self._client = redis.Redis.from_url(url)
+        self._pending: Dict[str, RunState] = {}
+        self._lock = Lock()
+
+    def upsert(self, run_state: RunState, flush: bool = True) -> None:
+        """Record the state; with flush=False the Redis write is deferred
+        until the next flushing upsert, which drains the batch in one
+        pipeline round-trip."""
+        run_state.invalidate_results_cache()
+        with self._lock:
+            self._pending[run_state.run_id] = run_state
+            if not flush:
+                return
+            pending, self._pending = self._pending, {}
+        pipe = self._client.pipeline()
+        for run_id, state in pending.items():
+            pipe.set(f"run:{run_id}", state.model_dump_json())
+        pipe.execute()
 
     def get(self, run_id: str) -> RunState | None:
         with self._lock:
-            return self._runs.get(run_id)
+            pending = self._pending.get(run_id)
+        if pending is not None:
+            return pending
+        raw = self._client.get(f"run:{run_id}")
+        if raw is None:
+            return None
+        return RunState.model_validate_json(raw)
 
 
-run_store = InMemoryRunStore()
+_redis_url = os.getenv("REDIS_URL", "")
+run_store = RedisRunStore(_redis_url) if _redis_url else InMemoryRunStore()
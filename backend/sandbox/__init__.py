@@ -0,0 +1,3 @@
+from .executor import ExecutionResult, SandboxExecutor
+
+__all__ = ["ExecutionResult", "SandboxExecutor"]
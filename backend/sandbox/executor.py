@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+import logging
+import os
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Stop pytest after this many failures - the fix loop repairs a bounded
+# set per iteration, so collecting hundreds more is wasted test time.
+_MAXFAIL = int(os.getenv("PYTEST_MAXFAIL", "25"))
+# Retained output lines per stream. Streams are drained line-by-line into
+# bounded deques, so a repo that spews megabytes of traceback text costs
+# constant memory; only the tail (where pytest puts its FAILURES section
+# and summary) is kept for parsing.
+_MAX_CAPTURED_LINES = int(os.getenv("PYTEST_MAX_OUTPUT_LINES", "4000"))
+_TIMEOUT_SECONDS = int(os.getenv("PYTEST_TIMEOUT_SECONDS", "300"))
+
+
+@dataclass
+class ExecutionResult:
+    """Captured pytest output, kept as raw bytes.
+
+    Decoding multi-megabyte logs up front costs a full UTF-8 pass that is
+    wasted when the parser only looks at a few matched slices, so callers
+    decode just what they use.
+    """
+
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+
+
+class SandboxExecutor:
+    """Runs the target repository's pytest suite as a subprocess."""
+
+    def run_pytest(self, repo_path: str) -> ExecutionResult:
+        # --tb=short emits 'file.py:N: in func' frames followed by
+        # 'E   ErrorType:' lines - the exact shape TestAgent's parser
+        # walks, without pytest-internal frames polluting the locations.
+        cmd = [sys.executable, "-m", "pytest", "--tb=short", f"--maxfail={_MAXFAIL}"]
+        logger.debug("Running %s in %s", cmd, repo_path)
+
+        proc = subprocess.Popen(
+            cmd,
+            cwd=repo_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        stdout_tail: deque[bytes] = deque(maxlen=_MAX_CAPTURED_LINES)
+        stderr_tail: deque[bytes] = deque(maxlen=_MAX_CAPTURED_LINES)
+
+        # Both pipes are drained on side threads so neither can fill up
+        # and deadlock the child, and - crucially - so the timeout below
+        # is enforced from the start: draining stdout inline would block
+        # until the child closes it, letting a hung test run forever.
+        stdout_thread = threading.Thread(target=self._drain, args=(proc.stdout, stdout_tail), daemon=True)
+        stderr_thread = threading.Thread(target=self._drain, args=(proc.stderr, stderr_tail), daemon=True)
+        stdout_thread.start()
+        stderr_thread.start()
+
+        try:
+            returncode = proc.wait(timeout=_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            logger.error("pytest timed out after %ds in %s", _TIMEOUT_SECONDS, repo_path)
+            returncode = 124
+        finally:
+            # The kill closes the pipes, so the drains finish promptly.
+            stdout_thread.join(timeout=5)
+            stderr_thread.join(timeout=5)
+
+        return ExecutionResult(
+            returncode=returncode,
+            stdout=b"".join(stdout_tail),
+            stderr=b"".join(stderr_tail),
+        )
+
+    @staticmethod
+    def _drain(stream, sink: deque[bytes]) -> None:
+        for line in stream:
+            sink.append(line)
+        stream.close()
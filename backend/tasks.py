@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import logging
+import os
+
+from celery import Celery
+
+from agents import OrchestratorAgent
+from models import RunAgentRequest
+
+logger = logging.getLogger(__name__)
+
+_BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+# Workers must share run state with the API through Redis; with the
+# default InMemoryRunStore the dispatched run_id is unknown here and
+# execute_run would return without doing anything.
+if not os.getenv("REDIS_URL"):
+    raise RuntimeError("Celery workers require REDIS_URL so run state is shared with the API process")
+if os.getenv("GITHUB_WEBHOOK_SECRET"):
+    raise RuntimeError(
+        "GITHUB_WEBHOOK_SECRET cannot be combined with Celery workers: "
+        "webhook events arrive in the API process but runs wait here; unset one of them"
+    )
+
+app = Celery("cicd_healer", broker=_BROKER_URL, backend=_BROKER_URL)
+
+# One orchestrator per worker process, created on first task - Celery
+# forks workers before GITHUB_TOKEN-dependent agents can be built.
+_orchestrator: OrchestratorAgent | None = None
+
+
+def _get_orchestrator() -> OrchestratorAgent:
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = OrchestratorAgent(retry_limit=int(os.getenv("RETRY_LIMIT", "5")))
+    return _orchestrator
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=60)
+def run_pipeline(self, run_id: str, payload_json: str) -> None:
+    """Execute the full healing pipeline for one run on a Celery worker.
+
+    The payload travels as JSON so the broker message stays a plain
+    string; the worker rebuilds the validated RunAgentRequest.
+    """
+    payload = RunAgentRequest.model_validate_json(payload_json)
+    try:
+        _get_orchestrator().execute_run(run_id, payload)
+    except Exception as exc:
+        logger.error("run_pipeline failed for %s: %s", run_id, exc)
+        raise self.retry(exc=exc)
@@ -29,7 +29,7 @@ def test_github_token_authentication():
     print(f"✓ GITHUB_TOKEN loaded: {token_configured}")
     print(f"✓ Token value (first 10 chars): {(git_agent.github_token[:10] if git_agent.github_token else 'NOT SET')}")
     print(f"✓ git_agent.push_branch() will use token: {token_configured}")
-    print(f"✓ repo_agent._inject_token_if_github() adds token to clone URL: ✓")
+    print(f"✓ git operations supply token via GIT_ASKPASS (git_credential_env): ✓")
     
     return token_configured or True  # True because it gracefully handles missing token
 